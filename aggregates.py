@@ -0,0 +1,693 @@
+"""Materialized rollups of marks by department, subject and semester.
+
+MarkAggregate keeps count, sum, sum of squares, min and max of Mark.total (plus
+internal/external sums) per group, and StudentTotal keeps each student's count,
+sum and mean overall and per semester. Student.cgpa is derived from the
+overall StudentTotal row. The rows are kept current by an after_flush hook
+that turns every inserted, updated or deleted Mark, and every Student that
+changes department, into +/- contributions. Dashboards read the rollups in
+O(#groups), GPAs and the cohort average from single rows and top-N lists from
+an index instead of scanning the Mark table. audit_aggregates checks all of it
+against a full recompute.
+"""
+import math
+from decimal import Decimal
+from sqlalchemy import event, select, delete, update, insert, func, literal, inspect, type_coerce, case, bindparam
+from sqlalchemy.orm.util import identity_key
+from models import db, User, Student, Mark, MarkAggregate, StudentTotal
+from database import accumulating_insert
+import change_feed
+
+# Rollup name -> Mark/Student columns that make up its key
+GRAINS = {
+    'department': ('department',),
+    'subject': ('subject',),
+    'semester': ('semester',),
+    'subject_semester': ('subject', 'semester'),
+    'department_subject': ('department', 'subject'),
+    'cohort': (),  # every mark
+}
+
+# Placeholder stored for key columns that are not part of a grain
+_UNUSED = {'department': '', 'subject': '', 'semester': 0}
+
+_MARK_FIELDS = ('student_id', 'semester', 'subject', 'internal', 'external', 'total')
+
+# Largest value Student.cgpa (Numeric(3,2)) holds
+CGPA_MAX = 9.99
+
+
+def counted(semester, subject, total):
+    """Whether a mark counts towards the rollups: it needs a total, semester and subject."""
+    return total is not None and semester is not None and subject is not None
+
+
+def _counted_marks():
+    """SQL condition matching the marks counted() accepts."""
+    return Mark.total.is_not(None) & Mark.semester.is_not(None) & Mark.subject.is_not(None)
+
+
+def _key_sources():
+    """Mark/Student expressions of the key columns; students without a department group under ''."""
+    return {
+        'department': func.coalesce(Student.department, _UNUSED['department']),
+        'subject': Mark.subject,
+        'semester': Mark.semester,
+    }
+
+
+def _group_key(grain, department, subject, semester):
+    columns = GRAINS[grain]
+    return (
+        grain,
+        department if 'department' in columns else _UNUSED['department'],
+        subject if 'subject' in columns else _UNUSED['subject'],
+        semester if 'semester' in columns else _UNUSED['semester'],
+    )
+
+
+def apply_contributions(connection, added=(), removed=()):
+    """Fold mark contributions into the rollup tables.
+
+    ``added`` and ``removed`` are iterables of
+    (department, subject, semester, internal, external, total) tuples;
+    marks that don't count (see counted()) are skipped. Inserts are ``added`` only, deletes are ``removed`` only and updates are
+    both. All deltas are combined per group first and written as relative
+    upserts (count = count + delta, ...), so concurrent transactions never
+    lose each other's updates. Groups that lose a min/max are rescanned
+    afterwards and groups left without marks are deleted.
+    """
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for department, subject, semester, internal, external, total in rows:
+            if not counted(semester, subject, total):
+                continue
+            internal = internal or 0
+            external = external or 0
+            for grain in GRAINS:
+                key = _group_key(grain, department, subject, semester)
+                delta = deltas.setdefault(key, {
+                    'count': 0, 'sum_total': 0, 'sumsq_total': 0,
+                    'sum_internal': 0, 'sum_external': 0,
+                    'min_added': None, 'max_added': None, 'removed': set()
+                })
+                delta['count'] += sign
+                delta['sum_total'] += sign * total
+                delta['sumsq_total'] += sign * total * total
+                delta['sum_internal'] += sign * internal
+                delta['sum_external'] += sign * external
+                if sign > 0:
+                    delta['min_added'] = total if delta['min_added'] is None else min(delta['min_added'], total)
+                    delta['max_added'] = total if delta['max_added'] is None else max(delta['max_added'], total)
+                else:
+                    delta['removed'].add(total)
+    if not deltas:
+        return
+
+    table = MarkAggregate.__table__
+    sums = ['count', 'sum_total', 'sumsq_total', 'sum_internal', 'sum_external']
+    # Rows in a fixed order, so concurrent batches lock shared groups in the same order
+    rows = [
+        {
+            'grain': key[0], 'department': key[1], 'subject': key[2], 'semester': key[3],
+            **{name: deltas[key][name] for name in sums},
+            'min_total': deltas[key]['min_added'], 'max_total': deltas[key]['max_added']
+        }
+        for key in sorted(deltas, key=repr)
+    ]
+    connection.execute(
+        accumulating_insert(connection, table, ['grain', 'department', 'subject', 'semester'],
+                             sums, ('min_total', 'max_total')),
+        rows
+    )
+    connection.execute(delete(table).where(table.c.count <= 0))
+
+    # Removing a group's extreme means it has to be rescanned, unless an added
+    # mark reaches at least as far (then it is the new one). Read after the
+    # upsert, which holds the group rows until commit
+    shrunk = {key for key, delta in deltas.items() if delta['removed']}
+    if not shrunk:
+        return
+    rescans = []
+    for row in connection.execute(
+        select(table.c.grain, table.c.department, table.c.subject, table.c.semester,
+               table.c.min_total, table.c.max_total)
+        .where(table.c.grain.in_({key[0] for key in shrunk}))
+    ):
+        key = tuple(row[:4])
+        if key not in shrunk:
+            continue
+        delta = deltas[key]
+        min_added, max_added = delta['min_added'], delta['max_added']
+        lost_min = any(total <= row.min_total for total in delta['removed']) and (min_added is None or min_added > row.min_total)
+        lost_max = any(total >= row.max_total for total in delta['removed']) and (max_added is None or max_added < row.max_total)
+        if lost_min or lost_max:
+            rescans.append(key)
+    if rescans:
+        extremes = _rescan_extremes(connection, rescans)
+        same_key = (
+            (table.c.grain == bindparam('key_grain')) & (table.c.department == bindparam('key_department'))
+            & (table.c.subject == bindparam('key_subject')) & (table.c.semester == bindparam('key_semester'))
+        )
+        connection.execute(
+            update(table).where(same_key),
+            [
+                {'key_grain': key[0], 'key_department': key[1], 'key_subject': key[2], 'key_semester': key[3],
+                 'min_total': extremes[key][0], 'max_total': extremes[key][1]}
+                for key in rescans
+            ]
+        )
+
+
+def _mean(sum_total, count):
+    """SQL expression for a rounded mean of totals."""
+    return func.round(sum_total * 1.0 / count, 2)
+
+
+def _student_mean(table):
+    """SQL expression for a StudentTotal row's rounded mean."""
+    return _mean(table.c.sum_total, table.c.count)
+
+
+def _cgpa(sum_total, count):
+    """SQL expression for the CGPA stored on Student: mean / 10, rounded, at most CGPA_MAX."""
+    cgpa = func.round(sum_total * 1.0 / (count * 10), 2)
+    return case((cgpa > CGPA_MAX, CGPA_MAX), else_=cgpa)
+
+
+def _refresh_cgpa(connection, student_ids=None):
+    """Set Student.cgpa from the overall StudentTotal rows (0 without marks)."""
+    totals, students = StudentTotal.__table__, Student.__table__
+    overall = (
+        select(_cgpa(totals.c.sum_total, totals.c.count))
+        .where(totals.c.student_id == students.c.id, totals.c.semester == 0)
+        .scalar_subquery()
+    )
+    stmt = update(students).values(cgpa=func.coalesce(overall, 0))
+    if student_ids is not None:
+        stmt = stmt.where(students.c.id.in_(student_ids))
+    connection.execute(stmt)
+
+
+def apply_student_contributions(connection, added=(), removed=(), departments=None):
+    """Fold mark totals into the per-student running sums.
+
+    ``added`` and ``removed`` are iterables of (student_id, semester, total)
+    tuples of marks that count (see counted(); callers drop the others, as
+    the subject isn't passed here); each counts towards the student's row for that semester and the
+    overall row (semester 0). ``departments`` maps student ids to the
+    department stored on newly created rows. Rows are written as relative
+    upserts, like apply_contributions. The students' Student.cgpa is
+    refreshed as well; returns the (id, reg_no, cgpa) rows of the students
+    whose CGPA changed.
+    """
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for student_id, semester, total in rows:
+            if total is None or semester is None:
+                continue
+            for key in ((student_id, semester), (student_id, 0)):
+                count, total_sum = deltas.get(key, (0, 0))
+                deltas[key] = (count + sign, total_sum + sign * total)
+    if not deltas:
+        return []
+
+    table = StudentTotal.__table__
+    students = {student_id for student_id, _ in deltas}
+    before = dict(connection.execute(select(Student.id, Student.cgpa).where(Student.id.in_(students))).all())
+    connection.execute(
+        accumulating_insert(connection, table, ['student_id', 'semester'], ['count', 'sum_total']),
+        [
+            {'student_id': key[0], 'semester': key[1], 'department': (departments or {}).get(key[0]) or '',
+             'count': count, 'sum_total': total_sum}
+            for key, (count, total_sum) in sorted(deltas.items(), key=lambda item: repr(item[0]))
+        ]
+    )
+    connection.execute(delete(table).where(table.c.student_id.in_(students), table.c.count <= 0))
+    # Means are derived in SQL, the same way rebuild_aggregates computes them
+    connection.execute(
+        update(table).where(table.c.student_id.in_(students)).values(mean_total=_student_mean(table))
+    )
+    _refresh_cgpa(connection, students)
+    rows = connection.execute(
+        select(Student.id, Student.reg_no, Student.cgpa).where(Student.id.in_(students))
+    ).all()
+    return [row for row in rows if row.cgpa != before.get(row.id)]
+
+
+def cgpa_feed_changes(rows):
+    """Change feed entries for the rows apply_student_contributions returns."""
+    # Numeric columns load as Decimal, which feed readers such as Bokeh can't serialize
+    return [('cgpa', row.reg_no, float(row.cgpa)) for row in rows]
+
+
+def _rescan_extremes(connection, keys):
+    """{group key: (min, max)} recomputed from the Mark table, one query per grain."""
+    sources = _key_sources()
+    by_grain = {}
+    for key in keys:
+        by_grain.setdefault(key[0], []).append(key)
+
+    extremes = {}
+    for grain, grain_keys in by_grain.items():
+        columns = [name for name in ('department', 'subject', 'semester') if name in GRAINS[grain]]
+        stmt = (
+            select(*(sources[name] for name in columns), func.min(Mark.total), func.max(Mark.total))
+            .join(Student, Mark.student_id == Student.id)
+            .where(_counted_marks())
+            .group_by(*(sources[name] for name in columns))
+        )
+        # Narrow the scan to the values the keys use; extra groups are ignored
+        for position, name in enumerate(('department', 'subject', 'semester'), start=1):
+            if name in columns:
+                stmt = stmt.where(sources[name].in_({key[position] for key in grain_keys}))
+        found = {}
+        for row in connection.execute(stmt):
+            values = dict(zip(columns, row))
+            found[_group_key(grain, values.get('department'), values.get('subject'), values.get('semester'))] = tuple(row[-2:])
+        for key in grain_keys:
+            extremes[key] = found.get(key, (None, None))
+    return extremes
+
+
+def _rollup_query(grain):
+    """SELECT of one grain's MarkAggregate rows, computed from the Mark table."""
+    columns = GRAINS[grain]
+    sources = _key_sources()
+    keys = [
+        (sources[name] if name in columns else literal(_UNUSED[name])).label(name)
+        for name in ('department', 'subject', 'semester')
+    ]
+    stmt = (
+        select(
+            literal(grain).label('grain'),
+            *keys,
+            func.count(Mark.total),
+            func.sum(Mark.total),
+            func.sum(Mark.total * Mark.total),
+            func.min(Mark.total),
+            func.max(Mark.total),
+            # Missing internal/external marks count as 0, as in apply_contributions
+            func.coalesce(func.sum(Mark.internal), 0),
+            func.coalesce(func.sum(Mark.external), 0)
+        )
+        .join(Student, Mark.student_id == Student.id)
+        .where(_counted_marks())
+        .group_by(*[sources[name] for name in columns])
+    )
+    if not columns:
+        # Without GROUP BY there is a row even when there are no marks
+        stmt = stmt.having(func.count(Mark.total) > 0)
+    return stmt
+
+
+def _student_totals_query(overall):
+    """SELECT of the StudentTotal rows per semester, or the overall rows, from the Mark table."""
+    semester = literal(0) if overall else Mark.semester
+    return (
+        select(
+            Mark.student_id,
+            semester.label('semester'),
+            func.coalesce(Student.department, ''),
+            func.count(Mark.total),
+            func.sum(Mark.total),
+            _mean(func.sum(Mark.total), func.count(Mark.total))
+        )
+        .join(Student, Mark.student_id == Student.id)
+        .where(_counted_marks())
+        .group_by(Mark.student_id, Student.department, *([] if overall else [Mark.semester]))
+    )
+
+
+def rebuild_aggregates(connection):
+    """Recompute every rollup and CGPA from scratch with one GROUP BY per grain.
+
+    Needed after bulk writes that bypass the ORM (Core inserts, Query.delete).
+    """
+    _rebuild_student_totals(connection)
+    table = MarkAggregate.__table__
+    connection.execute(delete(table))
+    for grain in GRAINS:
+        connection.execute(
+            insert(table).from_select(
+                ['grain', 'department', 'subject', 'semester', 'count', 'sum_total',
+                 'sumsq_total', 'min_total', 'max_total', 'sum_internal', 'sum_external'],
+                _rollup_query(grain)
+            )
+        )
+
+
+def _rebuild_student_totals(connection):
+    table = StudentTotal.__table__
+    connection.execute(delete(table))
+    for overall in (False, True):
+        connection.execute(
+            insert(table).from_select(
+                ['student_id', 'semester', 'department', 'count', 'sum_total', 'mean_total'],
+                _student_totals_query(overall)
+            )
+        )
+    _refresh_cgpa(connection)
+
+
+def _same(stored, expected):
+    if isinstance(stored, (float, Decimal)) or isinstance(expected, (float, Decimal)):
+        return (
+            stored is not None and expected is not None
+            and math.isclose(float(stored), float(expected), abs_tol=1e-9)
+        )
+    return stored == expected
+
+
+def _diff(name, stored, expected):
+    """(table, key, stored, expected) for every key whose values differ."""
+    return [
+        (name, key, stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys(), key=repr)
+        if key not in stored or key not in expected
+        or not all(map(_same, stored[key], expected[key]))
+    ]
+
+
+def audit_aggregates(connection):
+    """Compare the stored rollups, student totals and CGPAs with a full recompute.
+
+    Returns (table, key, stored values, recomputed values) for every row that
+    differs, is missing or is left over; an empty list means all are current.
+    Nothing is written.
+    """
+    table = MarkAggregate.__table__
+    value_columns = ['count', 'sum_total', 'sumsq_total', 'min_total', 'max_total', 'sum_internal', 'sum_external']
+    stored = {
+        (row.grain, row.department, row.subject, row.semester): tuple(row[name] for name in value_columns)
+        for row in connection.execute(select(table)).mappings()
+    }
+    expected = {}
+    for grain in GRAINS:
+        for row in connection.execute(_rollup_query(grain)):
+            expected[tuple(row[:4])] = tuple(row[4:])
+    mismatches = _diff('mark_aggregate', stored, expected)
+
+    table = StudentTotal.__table__
+    stored = {
+        (row.student_id, row.semester): (row.department, row.count, row.sum_total, row.mean_total)
+        for row in connection.execute(select(table))
+    }
+    expected = {}
+    for overall in (False, True):
+        for row in connection.execute(_student_totals_query(overall)):
+            expected[tuple(row[:2])] = tuple(row[2:])
+    mismatches += _diff('student_total', stored, expected)
+
+    totals = select(
+        Mark.student_id,
+        _cgpa(func.sum(Mark.total), func.count(Mark.total)).label('cgpa')
+    ).where(_counted_marks()).group_by(Mark.student_id).subquery()
+    rows = connection.execute(
+        select(Student.id, Student.cgpa, func.coalesce(totals.c.cgpa, 0))
+        .outerjoin(totals, totals.c.student_id == Student.id)
+    ).all()
+    mismatches += _diff(
+        'student.cgpa',
+        {row[0]: (row[1],) for row in rows},
+        {row[0]: (row[2],) for row in rows}
+    )
+    return mismatches
+
+
+def ensure_aggregates():
+    """Backfill the rollups for databases created before they (or the cohort row) existed.
+
+    Adds the mark table's unique key first if it lacks it (see
+    migrate_db.ensure_mark_key), rebuilding the rollups when that drops
+    duplicate marks.
+    """
+    from migrate_db import ensure_mark_key
+    from cache import bump_data_version
+    dropped = ensure_mark_key(db.session.connection())
+    if dropped:
+        rebuild_aggregates(db.session.connection())
+        bump_data_version(db.session.connection(), Mark)
+    if dropped is not None:
+        db.session.commit()
+    has_marks = db.session.scalar(select(Mark.id).limit(1)) is not None
+    has_rollups = (
+        db.session.scalar(select(MarkAggregate.id).where(MarkAggregate.grain == 'cohort')) is not None
+        and db.session.scalar(select(StudentTotal.student_id).limit(1)) is not None
+    )
+    if has_marks and not has_rollups:
+        rebuild_aggregates(db.session.connection())
+        db.session.commit()
+
+
+def load_rollups():
+    """Return {grain: DataFrame} with count, mean, std, min and max per group.
+
+    Means and the sample standard deviation are derived from the stored sums,
+    matching what pandas' mean()/std() would give over the raw marks.
+    """
+    import pandas as pd
+    table = MarkAggregate.__table__
+    frame = pd.DataFrame.from_records(
+        db.session.execute(select(table)).all(),
+        columns=[column.name for column in table.columns]
+    )
+    rollups = {}
+    for grain, columns in GRAINS.items():
+        df = frame[frame['grain'] == grain]
+        n = df['count'].astype(float)
+        # Exact integer numerator avoids cancellation in sumsq - sum²/n
+        numerator = (df['count'] * df['sumsq_total'] - df['sum_total'] * df['sum_total']).astype(float)
+        result = pd.DataFrame({
+            'count': df['count'],
+            'mean': df['sum_total'] / n,
+            'std': (numerator / (n * (n - 1)).where(n > 1)).clip(lower=0) ** 0.5,
+            'min': df['min_total'],
+            'max': df['max_total'],
+            'mean_internal': df['sum_internal'] / n,
+            'mean_external': df['sum_external'] / n,
+        })
+        for name in columns:
+            result[name] = df[name]
+        rollups[grain] = result.set_index(list(columns)).sort_index() if columns else result
+    return rollups
+
+
+def gpa(sum_total, count):
+    """Grade point on the 10-point scale from a sum and count of totals (0 without marks)."""
+    return sum_total / (count * 100) * 10 if count else 0
+
+
+def cohort_gpa():
+    """Mean of every mark on the 10-point scale, from the cohort rollup row."""
+    table = MarkAggregate.__table__
+    row = db.session.execute(
+        select(table.c.sum_total, table.c.count).where(table.c.grain == 'cohort')
+    ).first()
+    return gpa(*row) if row else 0
+
+
+def student_kpis(student_id, semester=None):
+    """CGPA and current-semester GPA of one student from their StudentTotal rows.
+
+    With ``semester`` both cover that semester only. The current semester is
+    the latest one with marks.
+    """
+    table = StudentTotal.__table__
+    totals = {
+        row.semester: row
+        for row in db.session.execute(
+            select(table.c.semester, table.c.sum_total, table.c.count).where(table.c.student_id == student_id)
+        )
+    }
+    current = semester or max((key for key in totals if key), default=0)
+    overall, latest = totals.get(semester or 0), totals.get(current)
+    return {
+        'cgpa': round(gpa(overall.sum_total, overall.count), 2) if overall else 0,
+        'attendance': 95,  # This should be calculated from actual attendance data
+        'current_semester_gpa': round(gpa(latest.sum_total, latest.count), 2) if latest else 0
+    }
+
+
+def top_students_query(limit=10, semester=None, department=None):
+    """SELECT of the best StudentTotal rows by mean, ties broken by student id.
+
+    Served by ix_student_total_rank / ix_student_total_department_rank, so it
+    reads ``limit`` index entries however many students there are.
+    """
+    table = StudentTotal.__table__
+    stmt = select(table).where(table.c.semester == (semester or 0))
+    if department is not None:
+        stmt = stmt.where(table.c.department == department)
+    return stmt.order_by(table.c.mean_total.desc(), table.c.student_id).limit(limit)
+
+
+def top_students(limit=10, semester=None, department=None):
+    """Top students by mean total, overall or in one semester and/or department.
+
+    Returns a DataFrame with student_id (the raw stored key, as in
+    data_access.load_staff_marks), student_name, total (mean rounded to 2
+    places), semesters (number of marks), department and id (the UUID).
+    """
+    import pandas as pd
+    top = top_students_query(limit, semester, department).subquery('top')
+    rows = db.session.execute(
+        select(
+            type_coerce(top.c.student_id, db.String).label('student_id'),
+            User.name,
+            top.c.mean_total,
+            top.c.count,
+            top.c.department,
+            Student.id
+        )
+        .join(Student, Student.id == top.c.student_id)
+        .join(User, Student.user_id == User.id)
+        .order_by(top.c.mean_total.desc(), top.c.student_id)
+    ).all()
+    # Typed explicitly so an empty result still has numeric columns to round
+    return pd.DataFrame.from_records(
+        rows, columns=['student_id', 'student_name', 'total', 'semesters', 'department', 'id']
+    ).astype({'total': float, 'semesters': int})
+
+
+def _mark_values(obj, original):
+    """Mark fields either as loaded from the database or as currently set."""
+    if not original:
+        return {name: getattr(obj, name) for name in _MARK_FIELDS}
+    state = inspect(obj)
+    values = {}
+    for name in _MARK_FIELDS:
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if history.deleted else (history.unchanged or [None])[0]
+    return values
+
+
+def _force_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Load the previous value on assignment so that history always knows what a
+# changed row used to contribute, even for expired instances
+for _attribute in [getattr(Mark, name) for name in _MARK_FIELDS] + [Student.department]:
+    event.listen(_attribute, 'set', _force_old_value, active_history=True, retval=True)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _load_deleted_rows(session, flush_context, instances):
+    # Deleted rows must be fully loaded before they disappear from the table
+    for obj in session.deleted:
+        if isinstance(obj, Mark):
+            for name in _MARK_FIELDS:
+                getattr(obj, name)
+        elif isinstance(obj, Student):
+            obj.department
+
+
+def _stored_department(obj):
+    """A Student's department as stored before this flush, '' for none."""
+    history = inspect(obj).attrs.department.history
+    return (history.deleted or history.unchanged or [None])[0] or ''
+
+
+def _collect_changes(session):
+    """Marks the flush adds and removes, and {student id: stored department}
+    of the students it moves to another department or deletes.
+    """
+    added, removed = [], []
+    moved_students, deleted_students = {}, {}
+    for obj in session.new:
+        if isinstance(obj, Mark):
+            added.append(_mark_values(obj, original=False))
+    for obj in session.deleted:
+        if isinstance(obj, Mark):
+            removed.append(_mark_values(obj, original=True))
+        elif isinstance(obj, Student):
+            deleted_students[obj.id] = _stored_department(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Mark) and session.is_modified(obj):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in _MARK_FIELDS):
+                removed.append(_mark_values(obj, original=True))
+                added.append(_mark_values(obj, original=False))
+        elif isinstance(obj, Student):
+            history = inspect(obj).attrs.department.history
+            if history.has_changes() and history.deleted:
+                moved_students[obj.id] = history.deleted[0] or ''
+    return added, removed, moved_students, deleted_students
+
+
+def _contributions(marks, departments):
+    return [
+        (departments.get(m['student_id'], ''), m['subject'], m['semester'], m['internal'], m['external'], m['total'])
+        for m in marks
+    ]
+
+
+def _note_cgpa_changes(session, changed):
+    """Send changed CGPAs to the change feed and mark them for reloading."""
+    change_feed.record(session, cgpa_feed_changes(changed))
+    session.info.setdefault('cgpa_refreshed', set()).update(row.id for row in changed)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_aggregates(session, flush_context):
+    added, removed, moved_students, deleted_students = _collect_changes(session)
+    added, removed = (
+        [m for m in marks if counted(m['semester'], m['subject'], m['total'])] for marks in (added, removed)
+    )
+    if not (added or removed or moved_students):
+        return
+
+    connection = session.connection()
+    student_ids = {m['student_id'] for m in added + removed} | set(moved_students)
+    rows = connection.execute(
+        select(Student.id, Student.department).where(Student.id.in_(student_ids))
+    ).all()
+    # Rollup keys hold '' for a missing department, as MarkAggregate requires
+    current = {row.id: row.department or '' for row in rows}
+    # Students deleted in this flush are gone from the table; their marks
+    # leave the groups of the department they had
+    for student_id, department in deleted_students.items():
+        current.setdefault(student_id, department)
+    previous = {**current, **moved_students}
+
+    changed = apply_student_contributions(
+        connection,
+        [(m['student_id'], m['semester'], m['total']) for m in added],
+        [(m['student_id'], m['semester'], m['total']) for m in removed],
+        current
+    )
+    _note_cgpa_changes(session, changed)
+    added = _contributions(added, current)
+    removed = _contributions(removed, previous)
+
+    if moved_students:
+        table = StudentTotal.__table__
+        for student_id in moved_students:
+            connection.execute(
+                update(table).where(table.c.student_id == student_id).values(department=current.get(student_id) or '')
+            )
+        # Marks of a student whose department changed move between groups;
+        # marks written in this same flush are already covered above
+        touched = {obj.id for obj in session.new | session.dirty | session.deleted if isinstance(obj, Mark)}
+        rows = connection.execute(
+            select(Mark.id, Mark.student_id, Mark.subject, Mark.semester, Mark.internal, Mark.external, Mark.total)
+            .where(Mark.student_id.in_(moved_students))
+        ).all()
+        for row in rows:
+            if row.id in touched:
+                continue
+            values = (row.subject, row.semester, row.internal, row.external, row.total)
+            removed.append((moved_students[row.student_id],) + values)
+            added.append((current.get(row.student_id, ''),) + values)
+
+    apply_contributions(connection, added, removed)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_refreshed_cgpa(session, flush_context):
+    # Student.cgpa was rewritten in SQL; loaded students reload it on next access
+    for student_id in session.info.pop('cgpa_refreshed', ()):
+        student = session.identity_map.get(identity_key(Student, student_id))
+        if student is not None:
+            session.expire(student, ['cgpa'])
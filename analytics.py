@@ -0,0 +1,15 @@
+"""Vectorized analytics shared by the student and staff dashboards."""
+
+
+def cumulative_average(df, by, order, value='total'):
+    """Running mean of ``value`` within each ``by`` group, in ``order``.
+
+    One grouped cumsum/cumcount pass over the frame, so the cost is linear in
+    the number of rows however many groups there are. The result is aligned
+    to ``df``'s index.
+    """
+    ordered = df.sort_values([by, order], kind='stable')
+    # As floats: an empty frame built from no rows has object columns, which cumsum rejects
+    grouped = ordered[value].astype(float).groupby(ordered[by], sort=False)
+    running = grouped.cumsum() / (grouped.cumcount() + 1)
+    return running.reindex(df.index)
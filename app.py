@@ -1,43 +1,131 @@
+import copy
+import io
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import secrets
+import click
+from werkzeug.http import is_resource_modified
+from flask import Blueprint, Flask, current_app, render_template, stream_template, request, redirect, url_for, flash, jsonify
 from models import db, User, Student, Mark
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.utils
-import pandas as pd
-import json
+from data_access import count_students, mentees_of, student_mark_rows
+from staff_stats import load_staff_series, SUBJECT_BOX_COLUMNS, SUBJECT_OUTLIER_COLUMNS
+from aggregates import load_rollups, ensure_aggregates, top_students, student_kpis, cohort_gpa, audit_aggregates, rebuild_aggregates
+from cache import LRUCache, register_cache, data_version, bump_data_version
+from http_cache import conditional_on_data_version
+from compression import init_compression
+from serialization import init_serialization, figure_json
+from mark_import import import_marks, sheet_format
+from charts import StudentCharts, FIGURES, ANIMATION_MENU, student_figure_cache, figure_timings
+from network_graph import network_artifact
+from config import Config
+from database import engine_options, configure_engine
 import uuid
-import random
-from pyvis.network import Network
-import networkx as nx
-from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource
-from bokeh.io import curdoc
-from bokeh.layouts import column
-from bokeh.server.server import Server
-from bokeh.application import Application
-from bokeh.application.handlers import FunctionHandler
-from tornado.ioloop import IOLoop
-import threading
-import time
 
-def create_app():
+bp = Blueprint('main', __name__)
+
+def create_app(test_config=None):
+    """Build an app from config.Config, FLASK_* environment variables and test_config.
+
+    Does not touch the database schema; run `flask --app wsgi init-db` once
+    before serving.
+    """
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = os.urandom(24)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///academic.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+    # Copied so environment overrides of nested settings don't leak into Config
+    app.config.from_mapping(copy.deepcopy({key: getattr(Config, key) for key in dir(Config) if key.isupper()}))
+    app.config.from_prefixed_env()
+    if test_config:
+        app.config.from_mapping(test_config)
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = instance_secret_key(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
     db.init_app(app)
-    
-    with app.app_context():
-        db.create_all()
-    
+    configure_engine(app, db)
+    init_compression(app)
+    init_serialization(app)
+    student_figure_cache.resize(app.config['STUDENT_FIGURE_CACHE_SIZE'], app.config['STUDENT_FIGURE_CACHE_BYTES'])
+    refresh_cache.resize(app.config['REFRESH_CACHE_SIZE'])
+
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(audit_aggregates_command)
+    app.cli.add_command(import_marks_command)
     return app
 
-app = create_app()
+def instance_secret_key(app):
+    """Read the instance folder's secret key, creating it on first use.
+
+    Creation is atomic, so workers starting together all end up with the key
+    written by whichever got there first.
+    """
+    path = os.path.join(app.instance_path, 'secret_key')
+    os.makedirs(app.instance_path, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    with open(path) as f:
+        return f.read().strip()
+
+def init_db():
+    """Create missing tables, the mark table's unique key and the mark rollups."""
+    db.create_all()
+    ensure_aggregates()
+
+@click.command('init-db')
+def init_db_command():
+    """Create the database schema and mark rollups."""
+    init_db()
+    click.echo('Initialized the database.')
+
+@click.command('audit-aggregates')
+@click.option('--repair', is_flag=True, help='Rebuild everything from the marks if anything is off.')
+def audit_aggregates_command(repair):
+    """Check the rollups, student totals and CGPAs against a full recompute."""
+    mismatches = audit_aggregates(db.session.connection())
+    for table, key, stored, expected in mismatches[:20]:
+        click.echo(f'{table} {key}: stored {stored}, recomputed {expected}')
+    if not mismatches:
+        click.echo('Aggregates are consistent with the marks.')
+        return
+    click.echo(f'{len(mismatches)} mismatched rows.')
+    if repair:
+        rebuild_aggregates(db.session.connection())
+        bump_data_version(db.session.connection())
+        db.session.commit()
+        click.echo('Rebuilt the aggregates.')
+    else:
+        raise SystemExit(1)
+
+def format_import_report(report):
+    """One-line summary of a mark_import report."""
+    return (f"{report['rows']} rows: {report['inserted']} inserted, {report['updated']} updated, "
+            f"{report['unchanged']} unchanged, {report['invalid']} invalid in {report['chunks']} chunks; "
+            f"{report['seconds']['total']:.2f}s ({report['rows_per_second'] or 0:,} rows/s)")
+
+@click.command('import-marks')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Sheet format (default: from the file name).')
+@click.option('--chunk-size', type=click.IntRange(min=1), help='Marks per transaction (default: MARK_IMPORT_CHUNK_SIZE).')
+def import_marks_command(path, fmt, chunk_size):
+    """Import a CSV or JSONL mark sheet."""
+    try:
+        report = import_marks(path, fmt or sheet_format(path),
+                              chunk_size or current_app.config['MARK_IMPORT_CHUNK_SIZE'])
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    for error in report['errors']:
+        click.echo(f"row {error['row']}: {error['error']}")
+    if report['invalid'] > len(report['errors']):
+        click.echo(f"... {report['invalid'] - len(report['errors'])} more invalid rows")
+    click.echo(format_import_report(report))
 
 def create_animated_charts(data, semester):
     """Create animated charts for staff dashboard."""
+    import pandas as pd
+    import plotly.express as px
     df = pd.DataFrame(data)
     
     # Animated Scatter Plot
@@ -55,31 +143,7 @@ def create_animated_charts(data, semester):
     fig_scatter.update_layout(
         xaxis_title='Semester',
         yaxis_title='Total Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ]
-            )
-        ]
+        updatemenus=ANIMATION_MENU
     )
     
     # Animated Bar Chart
@@ -95,191 +159,37 @@ def create_animated_charts(data, semester):
     fig_bar.update_layout(
         xaxis_title='Subject',
         yaxis_title='Total Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ]
-            )
-        ]
+        updatemenus=ANIMATION_MENU
     )
     
     return {
-        'scatter': json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder),
-        'bar': json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder)
-    }
-
-def create_network_diagram():
-    """Create a network visualization of student-staff relationships."""
-    
-    # Create network visualization
-    net = Network(height="500px", width="100%", notebook=False, directed=False)
-    
-    # Add nodes for students and staff
-    students = Student.query.all()
-    staff = User.query.filter_by(role='staff').all()
-    
-    # Ensure static directory exists
-    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
-    if not os.path.exists(static_dir):
-        os.makedirs(static_dir)
-    
-    # Add student nodes
-    for student in students:
-        net.add_node(
-            str(student.id), 
-            label=student.user.name, 
-            title=f"Student: {student.user.name}<br>Reg No: {student.reg_no}<br>Department: {student.department}",
-            color="#97c2fc",
-            shape="dot",
-            size=15
-        )
-    
-    # Add staff nodes
-    for staff_member in staff:
-        department = getattr(staff_member, 'department', 'Not specified')
-        net.add_node(
-            str(staff_member.id), 
-            label=staff_member.name, 
-            title=f"Staff: {staff_member.name}<br>Department: {department}",
-            color="#ff9999",
-            shape="star",
-            size=25
-        )
-    
-    # Add edges (random mentorship for demonstration)
-    for student in students:
-        # Assign 1-2 random staff mentors to each student
-        num_mentors = random.randint(1, 2)
-        mentors = random.sample(staff, min(num_mentors, len(staff)))
-        for mentor in mentors:
-            net.add_edge(
-                str(student.id), 
-                str(mentor.id), 
-                title="Mentor", 
-                color="#CCCCCC",
-                width=2
-            )
-    
-    # Enable physics for animation
-    net.set_options("""
-    {
-      "physics": {
-        "barnesHut": {
-          "gravitationalConstant": -80000,
-          "springConstant": 0.001,
-          "springLength": 200
-        },
-        "stabilization": {
-          "enabled": true,
-          "iterations": 1000
-        }
-      },
-      "interaction": {
-        "navigationButtons": true,
-        "keyboard": true
-      }
+        'scatter': figure_json(fig_scatter),
+        'bar': figure_json(fig_bar)
     }
-    """)
-    
-    # Save to HTML file with absolute path
-    network_path = os.path.join(static_dir, 'network.html')
-    net.save_graph(network_path)
-    
-    return "/static/network.html"
 
-def create_bokeh_app():
-    # Create a Bokeh app for live GPA streaming
-    def modify_doc(doc):
-        # Create a figure
-        p = figure(title="Live GPA Stream", x_axis_label="Time", y_axis_label="GPA", 
-                  width=600, height=400)
-        
-        # Create a ColumnDataSource
-        source = ColumnDataSource(data=dict(x=[], y=[]))
-        
-        # Add a line renderer
-        p.line('x', 'y', source=source, line_width=2)
-        
-        # Function to update data
-        def update():
-            # Get current time
-            x = time.time()
-            
-            # Get random GPA (for demonstration)
-            y = random.uniform(7.0, 9.5)
-            
-            # Update data
-            new_data = dict(
-                x=source.data['x'] + [x],
-                y=source.data['y'] + [y]
-            )
-            
-            # Keep only last 20 points
-            if len(new_data['x']) > 20:
-                new_data['x'] = new_data['x'][-20:]
-                new_data['y'] = new_data['y'][-20:]
-            
-            source.data = new_data
-        
-        # Add periodic callback
-        doc.add_periodic_callback(update, 500)
-        
-        # Add to document
-        doc.add_root(column(p))
-    
-    # Create application
-    app = Application(FunctionHandler(modify_doc))
-    
-    return app
+def request_params():
+    """Parameters of a GET query string or a JSON POST body."""
+    if request.method == 'GET':
+        return request.args
+    return request.get_json(silent=True) or {}
 
-# Start Bokeh server in a separate thread
-def start_bokeh_server():
-    """Start the Bokeh server on a dynamically allocated port to avoid conflicts."""
-    try:
-        # Try using a specific port first, but if it fails, try with port=0 to auto-assign
-        try:
-            server = Server({'/bokeh': create_bokeh_app()}, io_loop=IOLoop())
-            server.start()
-            server.io_loop.start()
-        except OSError:
-            # If the default port is in use, try to use a random available port
-            print("Warning: Default Bokeh port is in use. Trying with a random port...")
-            server = Server({'/bokeh': create_bokeh_app()}, io_loop=IOLoop(), port=0)
-            server.start()
-            server.io_loop.start()
-    except Exception as e:
-        print(f"Failed to start Bokeh server: {e}")
-        # Continue without Bokeh server
-
-# Start Bokeh server in a separate thread
-bokeh_thread = threading.Thread(target=start_bokeh_server)
-bokeh_thread.daemon = True
-bokeh_thread.start()
+def get_bokeh_host():
+    """The app's live GPA stream server, started on first use."""
+    app = current_app
+    host = app.extensions.get('bokeh_host')
+    if host is None:
+        from bokeh_host import BokehHost
+        host = app.extensions.setdefault('bokeh_host', BokehHost(
+            port=app.config['BOKEH_PORT'],
+            max_sessions=app.config['BOKEH_MAX_SESSIONS']
+        ))
+    return host.start()
 
-@app.route('/')
+@bp.route('/')
 def index():
-    return redirect(url_for('login'))
+    return redirect(url_for('.login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         name = request.form.get('name')
@@ -288,274 +198,80 @@ def login():
         user = User.query.filter_by(name=name, role=role).first()
         if user:
             if role == 'student':
-                return redirect(url_for('student_dashboard', id=user.student.id))
+                return redirect(url_for('.student_dashboard', id=user.student.id))
             else:
-                return redirect(url_for('staff_dashboard', id=user.id))
+                return redirect(url_for('.staff_dashboard', id=user.id))
         flash('User not found')
     return render_template('login.html')
 
-@app.route('/dashboard/student/<uuid:id>')
+@bp.route('/network')
+def network_view():
+    """Redirect to the network page built for the current data."""
+    return redirect(url_for('static', filename=network_artifact()))
+
+@bp.route('/live-gpa')
+def live_gpa():
+    """Redirect to the live GPA stream, starting its server if needed."""
+    return redirect(get_bokeh_host().url)
+
+@bp.route('/dashboard/student/<uuid:id>')
+@conditional_on_data_version(User, Student, Mark)
 def student_dashboard(id):
     student = Student.query.get_or_404(id)
     
-    # Calculate KPIs
-    total_marks = [m.total for m in student.marks]
-    cgpa = sum(total_marks) / (len(total_marks) * 100) * 10 if total_marks else 0
-    current_semester = max([m.semester for m in student.marks]) if student.marks else 0
-    current_semester_marks = [m.total for m in student.marks if m.semester == current_semester]
-    current_semester_gpa = sum(current_semester_marks) / (len(current_semester_marks) * 100) * 10 if current_semester_marks else 0
-    
-    # Create DataFrame for all marks
-    df = pd.DataFrame([{
-        'semester': m.semester,
-        'subject': m.subject,
-        'internal': m.internal,
-        'external': m.external,
-        'total': m.total
-    } for m in student.marks])
-    
-    # 1. Grouped Bar Chart (Internal vs External)
-    fig_bar = px.bar(
-        df,
-        x='subject',
-        y=['internal', 'external'],
-        title='Internal vs External Marks by Subject',
-        barmode='group',
-        color_discrete_sequence=['#2ecc71', '#3498db']
-    )
-    fig_bar.update_layout(
-        xaxis_title='Subject',
-        yaxis_title='Marks',
-        template='plotly_white'
-    )
-    
-    # 2. Line Chart (CGPA Trend)
-    semester_gpa = df.groupby('semester')['total'].mean().reset_index()
-    semester_gpa['gpa'] = semester_gpa['total'] / 10
-    fig_line = px.line(
-        semester_gpa,
-        x='semester',
-        y='gpa',
-        title='CGPA Trend Across Semesters',
-        markers=True
-    )
-    fig_line.update_layout(
-        xaxis_title='Semester',
-        yaxis_title='GPA',
-        template='plotly_white'
-    )
-    
-    # 3. Donut Chart (CGPA Gauge)
-    fig_donut = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=cgpa,
-        title={'text': "CGPA"},
-        gauge={
-            'axis': {'range': [0, 10]},
-            'bar': {'color': "#2ecc71"},
-            'steps': [
-                {'range': [0, 6], 'color': "#e74c3c"},
-                {'range': [6, 8], 'color': "#f1c40f"},
-                {'range': [8, 10], 'color': "#2ecc71"}
-            ]
-        }
-    ))
-    fig_donut.update_layout(template='plotly_white')
-    
-    # 4. Heatmap
-    pivot_df = df.pivot(index='subject', columns='semester', values='total')
-    fig_heatmap = px.imshow(
-        pivot_df,
-        title='Marks Heatmap (Subjects × Semesters)',
-        color_continuous_scale='RdYlGn'
-    )
-    fig_heatmap.update_layout(
-        xaxis_title='Semester',
-        yaxis_title='Subject',
-        template='plotly_white'
-    )
-    
-    # 5. Radar Chart (Current Semester)
-    current_semester_df = df[df['semester'] == current_semester]
-    fig_radar = go.Figure()
-    fig_radar.add_trace(go.Scatterpolar(
-        r=current_semester_df['total'],
-        theta=current_semester_df['subject'],
-        fill='toself',
-        name='Current Semester'
-    ))
-    fig_radar.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100]
-            )
-        ),
-        title='Current Semester Performance',
-        template='plotly_white'
-    )
-    
-    # 6. Box Plot
-    fig_box = px.box(
-        df,
-        x='semester',
-        y='total',
-        title='Marks Distribution by Semester'
-    )
-    fig_box.update_layout(
-        xaxis_title='Semester',
-        yaxis_title='Total Marks',
-        template='plotly_white'
-    )
-    
-    # 7. Animated Scatter Plot (Performance Animation)
-    fig_scatter = px.scatter(
-        df,
-        x='semester',
-        y='total',
-        animation_frame='semester',
-        animation_group='subject',
-        size='total',
-        color='subject',
-        title='Performance Across Semesters'
-    )
-    fig_scatter.update_layout(
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
-                xanchor="right",
-                y=0,
-                yanchor="top"
-            )
-        ]
-    )
-    
-    # 8. Animated Bar Chart (Subject Performance)
-    fig_bar_animated = px.bar(
-        df,
-        x='subject',
-        y='total',
-        animation_frame='semester',
-        title='Subject Performance Across Semesters'
-    )
-    fig_bar_animated.update_layout(
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
-                xanchor="right",
-                y=0,
-                yanchor="top"
-            )
-        ]
-    )
-    
-    # 9. Progress Chart (Cumulative Performance)
-    # Calculate cumulative average for each subject across semesters
-    subject_progress = df.groupby(['subject', 'semester'])['total'].mean().reset_index()
-    subject_progress = subject_progress.sort_values(['subject', 'semester'])
-    subject_progress['cumulative_avg'] = subject_progress.groupby('subject')['total'].transform('cumsum') / subject_progress.groupby('subject')['semester'].transform('count')
-    
-    fig_progress = px.line(
-        subject_progress,
-        x='semester',
-        y='cumulative_avg',
-        color='subject',
-        title='Subject Progress Over Time',
-        labels={'cumulative_avg': 'Cumulative Average', 'semester': 'Semester'}
-    )
-    fig_progress.update_layout(
-        template='plotly_white',
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01
-        )
-    )
-    
-    # Create network diagram
-    network_path = create_network_diagram()
-    
-    # Prepare all plots
-    plots = {
-        'bar': json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder),
-        'line': json.dumps(fig_line, cls=plotly.utils.PlotlyJSONEncoder),
-        'donut': json.dumps(fig_donut, cls=plotly.utils.PlotlyJSONEncoder),
-        'heatmap': json.dumps(fig_heatmap, cls=plotly.utils.PlotlyJSONEncoder),
-        'radar': json.dumps(fig_radar, cls=plotly.utils.PlotlyJSONEncoder),
-        'box': json.dumps(fig_box, cls=plotly.utils.PlotlyJSONEncoder),
-        'scatter': json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder),
-        'bar_animated': json.dumps(fig_bar_animated, cls=plotly.utils.PlotlyJSONEncoder),
-        'progress': json.dumps(fig_progress, cls=plotly.utils.PlotlyJSONEncoder)
-    }
-    
+    # Only the stored KPIs are rendered here; each chart is fetched from
+    # student_chart once it scrolls into view
     return render_template('student_dashboard.html',
                          student=student,
-                         plots=plots,
-                         network_path=network_path,
-                         kpis={
-                             'cgpa': round(cgpa, 2),
-                             'attendance': 95,  # This should be calculated from actual attendance data
-                             'current_semester_gpa': round(current_semester_gpa, 2)
-                         })
+                         network_path=url_for('.network_view'),
+                         kpis=student_kpis(student.id))
+
+@bp.route('/api/student/<uuid:id>/chart/<name>')
+def student_chart(id, name):
+    """One student dashboard figure as Plotly JSON, for ?semester=all (default) or 1-8.
 
-@app.route('/api/student-refresh-stats', methods=['POST'])
+    Sends an ETag derived from the marks and answers 304 without building the
+    figure when the client's copy is current. There is no Last-Modified: no
+    time is known for the marks that every worker would agree on.
+    """
+    if name not in FIGURES:
+        return jsonify({'error': f'Unknown chart {name!r}'}), 404
+    semester = request.args.get('semester', 'all')
+    if semester != 'all' and not semester.isdigit():
+        return jsonify({'error': 'Semester must be "all" or a number'}), 400
+    student = Student.query.get_or_404(id)
+    charts = StudentCharts(student_mark_rows(student.id, None if semester == 'all' else int(semester)))
+    
+    etag = f'{charts.key}-{name}'
+    if is_resource_modified(request.environ, etag=etag):
+        response = current_app.response_class(charts.figure_json(name), mimetype='application/json')
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    # Per-student data: browsers may keep it but must revalidate before reuse
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@bp.route('/api/student-refresh-stats', methods=['GET', 'POST'])
+@conditional_on_data_version(Student, Mark)
 def student_refresh_stats():
-    """Endpoint for student dashboard data refresh"""
-    data = request.json
+    """Endpoint for student dashboard data refresh.
+
+    Returns every figure unless the request lists the wanted ones in 'charts'
+    (e.g. [] for just the KPIs; comma-separated in a GET query string).
+    """
+    data = request_params()
     semester = data.get('semester')
     student_id = data.get('student_id')
+    names = data.get('charts')
+    if isinstance(names, str):
+        names = [name for name in names.split(',') if name]
     
     if not semester or not student_id:
         return jsonify({'error': 'Semester and student_id required'}), 400
+    if names is not None and not set(names) <= set(FIGURES):
+        return jsonify({'error': f'Unknown charts {sorted(set(names) - set(FIGURES))}'}), 400
     
     try:
         # Convert string ID to UUID object
@@ -563,99 +279,179 @@ def student_refresh_stats():
         # Get student
         student = Student.query.get_or_404(student_uuid)
         
-        # Get all marks for the student
-        all_marks = Mark.query.filter_by(student_id=student.id).all()
+        # Marks of the selected semester ('all' covers every semester)
+        semester = None if semester == 'all' else int(semester)
+        charts = StudentCharts(student_mark_rows(student.id, semester))
         
-        # Create DataFrame for all marks
-        df = pd.DataFrame([{
-            'semester': m.semester,
-            'subject': m.subject,
-            'internal': m.internal,
-            'external': m.external,
-            'total': m.total
-        } for m in all_marks])
-        
-        # Filter by semester if not 'all'
-        if semester != 'all':
-            df = df[df['semester'] == int(semester)]
-        
-        # Calculate KPIs
-        total_marks = df['total'].tolist()
-        cgpa = sum(total_marks) / (len(total_marks) * 100) * 10 if total_marks else 0
-        current_semester = max(df['semester'].unique()) if not df.empty else 0
-        current_semester_marks = df[df['semester'] == current_semester]['total'].tolist()
-        current_semester_gpa = sum(current_semester_marks) / (len(current_semester_marks) * 100) * 10 if current_semester_marks else 0
-        
-        # 1. Grouped Bar Chart (Internal vs External)
-        fig_bar = px.bar(
-            df,
-            x='subject',
-            y=['internal', 'external'],
-            title='Internal vs External Marks by Subject',
+        payload = {
+            f'{name}_chart': charts.figure_json(name)
+            for name in (FIGURES if names is None else names)
+        }
+        payload['kpis'] = student_kpis(student.id, semester)
+        return jsonify(payload)
+    except ValueError:
+        return jsonify({'error': 'Invalid student ID format'}), 400
+
+@bp.route('/dashboard/staff/<uuid:id>')
+@conditional_on_data_version()
+def staff_dashboard(id):
+    """Render the staff dashboard with analytics and visualization."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    # Get staff user
+    staff = User.query.get_or_404(id)
+    
+    # Per-student and per-subject series (aggregated in SQL on PostgreSQL)
+    series = load_staff_series(box_points=current_app.config['STAFF_BOX_POINTS'])
+    
+    # Precomputed department/subject/semester rollups
+    rollups = load_rollups()
+    
+    # Calculate KPIs
+    total_students = count_students()
+    avg_cgpa = cohort_gpa()
+    attendance_rate = 95  # This should be calculated from actual attendance data
+    
+    # Figures are built one at a time while the page streams, so the browser
+    # starts on the layout before the last chart is serialized
+    def plots():
+        # ============= CHART 1: Department Performance Overview =============
+        dept_performance = rollups['department'][['mean', 'count', 'mean_internal', 'mean_external']].round(2)
+        dept_performance.columns = ['avg_total', 'student_count', 'avg_internal', 'avg_external']
+    
+        fig_dept = go.Figure()
+        fig_dept.add_trace(go.Bar(
+            x=dept_performance.index,
+            y=dept_performance['avg_total'],
+            name='Average Total',
+            marker_color='#3498db'
+        ))
+        fig_dept.add_trace(go.Bar(
+            x=dept_performance.index,
+            y=dept_performance['avg_internal'],
+            name='Average Internal',
+            marker_color='#2ecc71'
+        ))
+        fig_dept.add_trace(go.Bar(
+            x=dept_performance.index,
+            y=dept_performance['avg_external'],
+            name='Average External',
+            marker_color='#e74c3c'
+        ))
+        fig_dept.update_layout(
+            title='Department Performance Overview',
+            xaxis_title='Department',
+            yaxis_title='Average Marks',
             barmode='group',
-            color_discrete_sequence=['#2ecc71', '#3498db']
+            template='plotly_white',
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
         )
-        fig_bar.update_layout(
+        yield 'dept', figure_json(fig_dept)
+    
+        # ============= CHART 2: Subject-wise Performance Distribution =============
+        fig_subject = go.Figure()
+        fig_subject.add_traces(subject_box_traces(series))
+        fig_subject.update_layout(
+            title='Subject-wise Performance Distribution',
             xaxis_title='Subject',
             yaxis_title='Marks',
             template='plotly_white'
         )
-        
-        # 2. Line Chart (CGPA Trend)
-        semester_gpa = df.groupby('semester')['total'].mean().reset_index()
-        semester_gpa['gpa'] = semester_gpa['total'] / 10
-        fig_line = px.line(
-            semester_gpa,
-            x='semester',
-            y='gpa',
-            title='CGPA Trend Across Semesters',
-            markers=True
+        yield 'subject', figure_json(fig_subject)
+    
+        # ============= CHART 3: Top 10 Performers =============
+        top_students = series['top_students'].rename(columns={'total': 'avg_marks'})
+    
+        fig_top = go.Figure()
+        fig_top.add_trace(go.Bar(
+            x=top_students['avg_marks'],
+            y=top_students['student_name'],
+            orientation='h',
+            marker_color='#2ecc71',
+            text=top_students['avg_marks'].round(2),
+            textposition='auto'
+        ))
+        fig_top.update_layout(
+            title='Top 10 Performers',
+            xaxis_title='Average Marks',
+            yaxis_title='Student',
+            template='plotly_white'
         )
-        fig_line.update_layout(
+        yield 'top', figure_json(fig_top)
+    
+        # ============= CHART 4: Semester-wise Performance Trend =============
+        semester_stats = rollups['semester'][['mean', 'std', 'count']].round(2)
+        semester_stats.columns = ['mean', 'std', 'student_count']
+    
+        fig_semester = go.Figure()
+        fig_semester.add_trace(go.Scatter(
+            x=semester_stats.index,
+            y=semester_stats['mean'],
+            mode='lines+markers',
+            name='Average Marks',
+            line=dict(color='#3498db', width=2),
+            marker=dict(size=8)
+        ))
+        fig_semester.add_trace(go.Scatter(
+            x=semester_stats.index,
+            y=semester_stats['mean'] + semester_stats['std'],
+            fill=None,
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False
+        ))
+        fig_semester.add_trace(go.Scatter(
+            x=semester_stats.index,
+            y=semester_stats['mean'] - semester_stats['std'],
+            fill='tonexty',
+            mode='lines',
+            line=dict(width=0),
+            name='Standard Deviation'
+        ))
+        fig_semester.update_layout(
+            title='Semester-wise Performance Trend',
             xaxis_title='Semester',
-            yaxis_title='GPA',
+            yaxis_title='Average Marks',
             template='plotly_white'
         )
-        
-        # 3. Donut Chart (CGPA Gauge)
-        fig_donut = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=cgpa,
-            title={'text': "CGPA"},
-            gauge={
-                'axis': {'range': [0, 10]},
-                'bar': {'color': "#2ecc71"},
-                'steps': [
-                    {'range': [0, 6], 'color': "#e74c3c"},
-                    {'range': [6, 8], 'color': "#f1c40f"},
-                    {'range': [8, 10], 'color': "#2ecc71"}
-                ]
-            }
+        yield 'semester', figure_json(fig_semester)
+    
+        # ============= CHART 5: Subject Performance Heatmap =============
+        pivot_df = rollups['subject_semester']['mean'].unstack('semester').fillna(0).round(2)
+    
+        fig_heatmap = go.Figure(data=go.Heatmap(
+            z=pivot_df.values,
+            x=pivot_df.columns,
+            y=pivot_df.index,
+            colorscale='RdYlGn',
+            zmin=0,
+            zmax=100
         ))
-        fig_donut.update_layout(template='plotly_white')
-        
-        # 4. Heatmap
-        pivot_df = df.pivot(index='subject', columns='semester', values='total')
-        fig_heatmap = px.imshow(
-            pivot_df,
-            title='Marks Heatmap (Subjects × Semesters)',
-            color_continuous_scale='RdYlGn'
-        )
         fig_heatmap.update_layout(
+            title='Subject Performance Heatmap',
             xaxis_title='Semester',
             yaxis_title='Subject',
             template='plotly_white'
         )
-        
-        # 5. Radar Chart (Current Semester)
-        current_semester_df = df[df['semester'] == current_semester]
+        yield 'heatmap', figure_json(fig_heatmap)
+    
+        # ============= CHART 6: Department-wise Subject Performance (Radar Chart) =============
+        dept_subject_avg = rollups['department_subject']['mean'].unstack('subject').fillna(0).round(2)
+    
         fig_radar = go.Figure()
-        fig_radar.add_trace(go.Scatterpolar(
-            r=current_semester_df['total'],
-            theta=current_semester_df['subject'],
-            fill='toself',
-            name='Current Semester'
-        ))
+        for dept in dept_subject_avg.index:
+            fig_radar.add_trace(go.Scatterpolar(
+                r=dept_subject_avg.loc[dept].values,
+                theta=dept_subject_avg.columns,
+                fill='toself',
+                name=dept
+            ))
         fig_radar.update_layout(
             polar=dict(
                 radialaxis=dict(
@@ -663,557 +459,239 @@ def student_refresh_stats():
                     range=[0, 100]
                 )
             ),
-            title='Current Semester Performance',
+            title='Department-wise Subject Performance',
             template='plotly_white'
         )
-        
-        # 6. Box Plot
-        fig_box = px.box(
-            df,
-            x='semester',
-            y='total',
-            title='Marks Distribution by Semester'
-        )
-        fig_box.update_layout(
-            xaxis_title='Semester',
-            yaxis_title='Total Marks',
-            template='plotly_white'
-        )
-        
-        # 7. Animated Scatter Plot (Performance Animation)
+        yield 'radar', figure_json(fig_radar)
+    
+        # ============= CHART 7: Student Performance Animation =============
         fig_scatter = px.scatter(
-            df,
+            series['student_semester'],
             x='semester',
             y='total',
             animation_frame='semester',
-            animation_group='subject',
+            animation_group='student_name',
             size='total',
-            color='subject',
-            title='Performance Across Semesters'
+            color='student_name',
+            title='Student Performance Across Semesters',
+            template='plotly_white'
         )
         fig_scatter.update_layout(
-            updatemenus=[
-                dict(
-                    type="buttons",
-                    buttons=[
-                        dict(
-                            label="Play",
-                            method="animate",
-                            args=[None, {
-                                "frame": {"duration": 1000, "redraw": True},
-                                "mode": "immediate",
-                                "fromcurrent": True
-                            }]
-                        ),
-                        dict(
-                            label="Pause",
-                            method="animate",
-                            args=[[None], {
-                                "frame": {"duration": 0, "redraw": False},
-                                "mode": "immediate",
-                                "fromcurrent": True
-                            }]
-                        )
-                    ],
-                    direction="left",
-                    pad={"r": 10, "t": 87},
-                    showactive=True,
-                    x=0.1,
-                    xanchor="right",
-                    y=0,
-                    yanchor="top"
-                )
-            ]
+            xaxis_title='Semester',
+            yaxis_title='Average Marks',
+            updatemenus=ANIMATION_MENU
         )
-        
-        # 8. Animated Bar Chart (Subject Performance)
-        fig_bar_animated = px.bar(
-            df,
+        yield 'scatter', figure_json(fig_scatter)
+    
+        # ============= CHART 8: Subject Performance Animation =============
+        subject_semester_avg = rollups['subject_semester']['mean'].rename('total').reset_index()
+    
+        fig_bar = px.bar(
+            subject_semester_avg,
             x='subject',
             y='total',
             animation_frame='semester',
-            title='Subject Performance Across Semesters'
+            color='subject',
+            title='Subject Performance Across Semesters',
+            template='plotly_white'
         )
-        fig_bar_animated.update_layout(
-            updatemenus=[
-                dict(
-                    type="buttons",
-                    buttons=[
-                        dict(
-                            label="Play",
-                            method="animate",
-                            args=[None, {
-                                "frame": {"duration": 1000, "redraw": True},
-                                "mode": "immediate",
-                                "fromcurrent": True
-                            }]
-                        ),
-                        dict(
-                            label="Pause",
-                            method="animate",
-                            args=[[None], {
-                                "frame": {"duration": 0, "redraw": False},
-                                "mode": "immediate",
-                                "fromcurrent": True
-                            }]
-                        )
-                    ],
-                    direction="left",
-                    pad={"r": 10, "t": 87},
-                    showactive=True,
-                    x=0.1,
-                    xanchor="right",
-                    y=0,
-                    yanchor="top"
-                )
-            ]
+        fig_bar.update_layout(
+            xaxis_title='Subject',
+            yaxis_title='Average Marks',
+            updatemenus=ANIMATION_MENU
         )
-        
-        # 9. Progress Chart (Cumulative Performance)
-        # Calculate cumulative average for each subject across semesters
-        subject_progress = df.groupby(['subject', 'semester'])['total'].mean().reset_index()
-        subject_progress = subject_progress.sort_values(['subject', 'semester'])
-        subject_progress['cumulative_avg'] = subject_progress.groupby('subject')['total'].transform('cumsum') / subject_progress.groupby('subject')['semester'].transform('count')
-        
+        yield 'bar', figure_json(fig_bar)
+    
+        # ============= CHART 9: Student Progress Chart =============
+        # Running mean of the top 10 students' semester averages, to avoid overcrowding
         fig_progress = px.line(
-            subject_progress,
+            series['progress'],
             x='semester',
             y='cumulative_avg',
-            color='subject',
-            title='Subject Progress Over Time',
-            labels={'cumulative_avg': 'Cumulative Average', 'semester': 'Semester'}
+            color='student_name',
+            title='Student Progress Over Time',
+            template='plotly_white'
         )
         fig_progress.update_layout(
-            template='plotly_white',
+            xaxis_title='Semester',
+            yaxis_title='Cumulative Average',
             legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=0.01
-            )
-        )
-        
-        return jsonify({
-            'bar_chart': json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder),
-            'line_chart': json.dumps(fig_line, cls=plotly.utils.PlotlyJSONEncoder),
-            'donut_chart': json.dumps(fig_donut, cls=plotly.utils.PlotlyJSONEncoder),
-            'heatmap_chart': json.dumps(fig_heatmap, cls=plotly.utils.PlotlyJSONEncoder),
-            'radar_chart': json.dumps(fig_radar, cls=plotly.utils.PlotlyJSONEncoder),
-            'box_chart': json.dumps(fig_box, cls=plotly.utils.PlotlyJSONEncoder),
-            'scatter_chart': json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder),
-            'bar_animated_chart': json.dumps(fig_bar_animated, cls=plotly.utils.PlotlyJSONEncoder),
-            'progress_chart': json.dumps(fig_progress, cls=plotly.utils.PlotlyJSONEncoder),
-            'kpis': {
-                'cgpa': round(cgpa, 2),
-                'attendance': 95,  # This should be calculated from actual attendance data
-                'current_semester_gpa': round(current_semester_gpa, 2)
-            }
-        })
-    except ValueError:
-        return jsonify({'error': 'Invalid student ID format'}), 400
-
-@app.route('/dashboard/staff/<uuid:id>')
-def staff_dashboard(id):
-    """Render the staff dashboard with analytics and visualization."""
-    # Get staff user
-    staff = User.query.get_or_404(id)
-    students = Student.query.all()
-    
-    # Create network diagram
-    network_path = create_network_diagram()
-    
-    # Get all marks and create DataFrame with proper type conversion
-    all_marks = Mark.query.all()
-    df = pd.DataFrame([{
-        'student_id': str(m.student.id),
-        'student_name': m.student.user.name,
-        'subject': m.subject,
-        'internal': float(m.internal),
-        'external': float(m.external),
-        'total': float(m.total),
-        'semester': m.semester,
-        'department': m.student.department
-    } for m in all_marks])
-    
-    # Calculate KPIs
-    total_students = len(students)
-    avg_cgpa = df['total'].mean() / 10 if not df.empty else 0
-    attendance_rate = 95  # This should be calculated from actual attendance data
-    
-    # Create plots dictionary to store chart data
-    plots = {}
-    
-    # ============= CHART 1: Department Performance Overview =============
-    dept_performance = df.groupby('department').agg({
-        'total': ['mean', 'count'],
-        'internal': 'mean',
-        'external': 'mean'
-    }).round(2)
-    dept_performance.columns = ['avg_total', 'student_count', 'avg_internal', 'avg_external']
-    
-    fig_dept = go.Figure()
-    fig_dept.add_trace(go.Bar(
-        x=dept_performance.index,
-        y=dept_performance['avg_total'],
-        name='Average Total',
-        marker_color='#3498db'
-    ))
-    fig_dept.add_trace(go.Bar(
-        x=dept_performance.index,
-        y=dept_performance['avg_internal'],
-        name='Average Internal',
-        marker_color='#2ecc71'
-    ))
-    fig_dept.add_trace(go.Bar(
-        x=dept_performance.index,
-        y=dept_performance['avg_external'],
-        name='Average External',
-        marker_color='#e74c3c'
-    ))
-    fig_dept.update_layout(
-        title='Department Performance Overview',
-        xaxis_title='Department',
-        yaxis_title='Average Marks',
-        barmode='group',
-        template='plotly_white',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-    )
-    plots['dept'] = json.dumps(fig_dept, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 2: Subject-wise Performance Distribution =============
-    subject_stats = df.groupby('subject').agg({
-        'total': ['mean', 'std', 'min', 'max'],
-        'student_id': 'count'
-    }).round(2)
-    subject_stats.columns = ['mean', 'std', 'min', 'max', 'student_count']
-    
-    fig_subject = go.Figure()
-    fig_subject.add_trace(go.Box(
-        y=df['total'],
-        x=df['subject'],
-        name='Marks Distribution',
-        boxpoints='all',
-        jitter=0.3,
-        pointpos=-1.8,
-        marker_color='#3498db'
-    ))
-    fig_subject.update_layout(
-        title='Subject-wise Performance Distribution',
-        xaxis_title='Subject',
-        yaxis_title='Marks',
-        template='plotly_white'
-    )
-    plots['subject'] = json.dumps(fig_subject, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 3: Top 10 Performers =============
-    top_students = df.groupby(['student_id', 'student_name']).agg({
-        'total': 'mean',
-        'semester': 'count'
-    }).round(2)
-    top_students.columns = ['avg_marks', 'semesters']
-    top_students = top_students.nlargest(10, 'avg_marks').reset_index()
-    
-    fig_top = go.Figure()
-    fig_top.add_trace(go.Bar(
-        x=top_students['avg_marks'],
-        y=top_students['student_name'],
-        orientation='h',
-        marker_color='#2ecc71',
-        text=top_students['avg_marks'].round(2),
-        textposition='auto'
-    ))
-    fig_top.update_layout(
-        title='Top 10 Performers',
-        xaxis_title='Average Marks',
-        yaxis_title='Student',
-        template='plotly_white'
-    )
-    plots['top'] = json.dumps(fig_top, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 4: Semester-wise Performance Trend =============
-    semester_stats = df.groupby('semester').agg({
-        'total': ['mean', 'std'],
-        'student_id': 'count'
-    }).round(2)
-    semester_stats.columns = ['mean', 'std', 'student_count']
-    
-    fig_semester = go.Figure()
-    fig_semester.add_trace(go.Scatter(
-        x=semester_stats.index,
-        y=semester_stats['mean'],
-        mode='lines+markers',
-        name='Average Marks',
-        line=dict(color='#3498db', width=2),
-        marker=dict(size=8)
-    ))
-    fig_semester.add_trace(go.Scatter(
-        x=semester_stats.index,
-        y=semester_stats['mean'] + semester_stats['std'],
-        fill=None,
-        mode='lines',
-        line=dict(width=0),
-        showlegend=False
-    ))
-    fig_semester.add_trace(go.Scatter(
-        x=semester_stats.index,
-        y=semester_stats['mean'] - semester_stats['std'],
-        fill='tonexty',
-        mode='lines',
-        line=dict(width=0),
-        name='Standard Deviation'
-    ))
-    fig_semester.update_layout(
-        title='Semester-wise Performance Trend',
-        xaxis_title='Semester',
-        yaxis_title='Average Marks',
-        template='plotly_white'
-    )
-    plots['semester'] = json.dumps(fig_semester, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 5: Subject Performance Heatmap =============
-    pivot_df = df.pivot_table(
-        index='subject',
-        columns='semester',
-        values='total',
-        aggfunc='mean'
-    ).fillna(0).round(2)
-    
-    fig_heatmap = go.Figure(data=go.Heatmap(
-        z=pivot_df.values,
-        x=pivot_df.columns,
-        y=pivot_df.index,
-        colorscale='RdYlGn',
-        zmin=0,
-        zmax=100
-    ))
-    fig_heatmap.update_layout(
-        title='Subject Performance Heatmap',
-        xaxis_title='Semester',
-        yaxis_title='Subject',
-        template='plotly_white'
-    )
-    plots['heatmap'] = json.dumps(fig_heatmap, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 6: Department-wise Subject Performance (Radar Chart) =============
-    dept_subject_avg = df.pivot_table(
-        index='department',
-        columns='subject',
-        values='total',
-        aggfunc='mean'
-    ).fillna(0).round(2)
-    
-    fig_radar = go.Figure()
-    for dept in dept_subject_avg.index:
-        fig_radar.add_trace(go.Scatterpolar(
-            r=dept_subject_avg.loc[dept].values,
-            theta=dept_subject_avg.columns,
-            fill='toself',
-            name=dept
-        ))
-    fig_radar.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100]
-            )
-        ),
-        title='Department-wise Subject Performance',
-        template='plotly_white'
-    )
-    plots['radar'] = json.dumps(fig_radar, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 7: Student Performance Animation =============
-    student_semester_avg = df.groupby(['student_id', 'student_name', 'semester'])['total'].mean().reset_index()
-    
-    fig_scatter = px.scatter(
-        student_semester_avg,
-        x='semester',
-        y='total',
-        animation_frame='semester',
-        animation_group='student_name',
-        size='total',
-        color='student_name',
-        title='Student Performance Across Semesters',
-        template='plotly_white'
-    )
-    fig_scatter.update_layout(
-        xaxis_title='Semester',
-        yaxis_title='Average Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
                 xanchor="right",
-                y=0,
-                yanchor="top"
+                x=1
             )
-        ]
-    )
-    plots['scatter'] = json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 8: Subject Performance Animation =============
-    subject_semester_avg = df.groupby(['subject', 'semester'])['total'].mean().reset_index()
-    
-    fig_bar = px.bar(
-        subject_semester_avg,
-        x='subject',
-        y='total',
-        animation_frame='semester',
-        color='subject',
-        title='Subject Performance Across Semesters',
-        template='plotly_white'
-    )
-    fig_bar.update_layout(
-        xaxis_title='Subject',
-        yaxis_title='Average Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
-                xanchor="right",
-                y=0,
-                yanchor="top"
-            )
-        ]
-    )
-    plots['bar'] = json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder)
-    
-    # ============= CHART 9: Student Progress Chart =============
-    student_progress = df.groupby(['student_id', 'student_name', 'semester'])['total'].mean().reset_index()
-    student_progress = student_progress.sort_values(['student_id', 'semester'])
-    
-    # Calculate cumulative average correctly
-    for student_id in student_progress['student_id'].unique():
-        mask = student_progress['student_id'] == student_id
-        student_progress.loc[mask, 'cumulative_avg'] = student_progress.loc[mask, 'total'].expanding().mean().values
-    
-    # Limit to first 10 students to avoid overcrowding
-    top_student_ids = top_students['student_id'].tolist()[:10]
-    filtered_progress = student_progress[student_progress['student_id'].isin(top_student_ids)]
-    
-    fig_progress = px.line(
-        filtered_progress,
-        x='semester',
-        y='cumulative_avg',
-        color='student_name',
-        title='Student Progress Over Time',
-        template='plotly_white'
-    )
-    fig_progress.update_layout(
-        xaxis_title='Semester',
-        yaxis_title='Cumulative Average',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
         )
-    )
-    plots['progress'] = json.dumps(fig_progress, cls=plotly.utils.PlotlyJSONEncoder)
+        yield 'progress', figure_json(fig_progress)
     
     # Render template with all chart data
-    return render_template('staff_dashboard.html',
+    return stream_template('staff_dashboard.html',
                          staff=staff,
-                         plots=plots,
-                         network_path=network_path,
+                         mentees=mentees_of(staff.id),
+                         plots=plots(),
+                         network_path=url_for('.network_view'),
                          kpis={
                              'total_students': total_students,
                              'avg_cgpa': round(avg_cgpa, 2),
                              'attendance_rate': attendance_rate
                          })
 
-@app.route('/api/refresh-stats', methods=['POST'])
+# Staff refresh payloads keyed by (endpoint, semester, data version)
+refresh_cache = register_cache(LRUCache(maxsize=32))
+
+@bp.route('/api/refresh-stats', methods=['GET', 'POST'])
+@conditional_on_data_version()
 def refresh_stats():
     """Endpoint for refreshing staff dashboard data based on semester selection."""
-    semester = request.json.get('semester')
+    params = request_params()
+    semester = params.get('semester')
     if not semester:
         return jsonify({'error': 'Semester required'}), 400
-        
-    # Get all marks
-    all_marks = Mark.query.all()
-    
-    # Create DataFrame for all marks with proper type conversion
-    df = pd.DataFrame([{
-        'student_id': str(m.student.id),
-        'student_name': m.student.user.name,
-        'subject': m.subject,
-        'internal': float(m.internal),
-        'external': float(m.external),
-        'total': float(m.total),
-        'semester': m.semester,
-        'department': m.student.department
-    } for m in all_marks])
+    semester = str(semester)
     
-    # Filter by semester if not 'all'
-    if semester != 'all':
-        df = df[df['semester'] == int(semester)]
+    # 'data' returns only the series for client-side templates
+    if params.get('format') == 'data':
+        payload = refresh_cache.get_or_create(
+            ('refresh-stats-data', semester, data_version()),
+            lambda: build_refresh_data(semester)
+        )
+    else:
+        payload = refresh_cache.get_or_create(
+            ('refresh-stats', semester, data_version()),
+            lambda: build_refresh_stats(semester)
+        )
+    return jsonify(payload)
+
+@bp.route('/api/marks/bulk', methods=['POST'])
+def bulk_marks():
+    """Import a CSV or JSONL mark sheet sent as the body or a 'file' upload.
+
+    The format comes from ?format=, the file name or the Content-Type. Returns
+    the import report; unreadable sheets get a 400.
+    """
+    upload = request.files.get('file')
+    try:
+        if upload is not None:
+            fmt = sheet_format(request.args.get('format'), upload.filename, upload.mimetype)
+            source = upload.stream
+        else:
+            fmt = sheet_format(request.args.get('format'), request.mimetype)
+            source = io.BytesIO(request.get_data())
+        report = import_marks(source, fmt, current_app.config['MARK_IMPORT_CHUNK_SIZE'])
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify(report)
+
+@bp.route('/api/top-students')
+def top_students_api():
+    """Top students by mean mark, optionally for one semester and/or department."""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    semester = request.args.get('semester', type=int)
+    department = request.args.get('department') or None
+    top = top_students(limit, semester, department)
+    return jsonify([
+        {
+            'id': str(row.id),
+            'name': row.student_name,
+            'department': row.department,
+            'mean': row.total,
+            'marks': int(row.semesters)
+        }
+        for row in top.itertuples()
+    ])
+
+@bp.route('/api/cache-stats')
+def cache_stats():
+    """Hit/miss counters of the in-process result caches."""
+    return jsonify({
+        'refresh_stats': refresh_cache.stats(),
+        'student_figures': student_figure_cache.stats()
+    })
+
+@bp.route('/api/chart-timings')
+def chart_timings():
+    """Per-figure build/serialization times of the student chart pipeline."""
+    return jsonify(figure_timings.report())
+
+def subject_box_traces(series):
+    """Box of marks per subject from the precomputed quartiles, plus the sampled outliers."""
+    import plotly.graph_objects as go
+    box = series['subject_box']
+    outliers = series['subject_outliers']
+    return [
+        go.Box(
+            x=box['subject'],
+            q1=box['q1'],
+            median=box['median'],
+            q3=box['q3'],
+            lowerfence=box['lowerfence'],
+            upperfence=box['upperfence'],
+            mean=box['mean'],
+            name='Marks Distribution',
+            marker_color='#3498db'
+        ),
+        go.Scatter(
+            x=outliers['subject'],
+            y=outliers['total'],
+            mode='markers',
+            name='Outliers',
+            marker_color='#3498db',
+            showlegend=False
+        )
+    ]
+
+def build_refresh_data(semester):
+    """Data-only variant of build_refresh_stats.
+
+    Sends just the aggregated series as columns; static/js/chart_templates.js
+    holds the layouts and rebuilds the figures in the browser.
+    """
+    series = load_staff_series(None if semester == 'all' else int(semester), all_students=False,
+                               box_points=current_app.config['STAFF_BOX_POINTS'])
+    top_students = series['top_students']
+    student_semester_filtered = series['student_semester']
+    subject_semester_avg = series['subject_semester']
+    
+    subject = {
+        'box': {name: series['subject_box'][name].tolist() for name in SUBJECT_BOX_COLUMNS},
+        'outliers': {name: series['subject_outliers'][name].tolist() for name in SUBJECT_OUTLIER_COLUMNS}
+    }
+    return {
+        'semester_label': f"Semester {semester}" if semester != 'all' else "All Semesters",
+        'subject': subject,
+        'top': {
+            'student_name': top_students['student_name'].tolist(),
+            'total': top_students['total'].round(2).tolist()
+        },
+        'scatter': {
+            'student_name': student_semester_filtered['student_name'].tolist(),
+            'semester': student_semester_filtered['semester'].tolist(),
+            'total': student_semester_filtered['total'].round(2).tolist()
+        },
+        'bar': {
+            'subject': subject_semester_avg['subject'].tolist(),
+            'semester': subject_semester_avg['semester'].tolist(),
+            'total': subject_semester_avg['total'].round(2).tolist()
+        }
+    }
+
+def build_refresh_stats(semester):
+    """Build the staff refresh charts for 'all' or a single semester."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    # Series for the selected semester ('all' covers every semester)
+    series = load_staff_series(None if semester == 'all' else int(semester), all_students=False,
+                               box_points=current_app.config['STAFF_BOX_POINTS'])
+    top_students = series['top_students']
+    student_semester_filtered = series['student_semester']
+    subject_semester_avg = series['subject_semester']
     
     # ============= CHART 1: Subject Performance Distribution =============
     fig_subject = go.Figure()
     
-    if not df.empty:
-        fig_subject.add_trace(go.Box(
-            y=df['total'],
-            x=df['subject'],
-            name='Marks Distribution',
-            boxpoints='all',
-            jitter=0.3,
-            pointpos=-1.8,
-            marker_color='#3498db'
-        ))
+    if series['mean_total'] is not None:
+        fig_subject.add_traces(subject_box_traces(series))
     
     semester_label = f"Semester {semester}" if semester != 'all' else "All Semesters"
     fig_subject.update_layout(
@@ -1224,9 +702,6 @@ def refresh_stats():
     )
     
     # ============= CHART 2: Top Performers =============
-    top_students = df.groupby(['student_id', 'student_name'])['total'].mean().reset_index()
-    top_students = top_students.nlargest(10, 'total')
-    
     fig_top = go.Figure()
     
     if not top_students.empty:
@@ -1247,12 +722,6 @@ def refresh_stats():
     )
     
     # ============= CHART 3: Student Performance Animation =============
-    student_semester_avg = df.groupby(['student_id', 'student_name', 'semester'])['total'].mean().reset_index()
-    
-    # Use only top 15 students to avoid visual clutter
-    top_student_ids = top_students['student_id'].tolist()[:15] if not top_students.empty else []
-    student_semester_filtered = student_semester_avg[student_semester_avg['student_id'].isin(top_student_ids)] if top_student_ids else student_semester_avg
-    
     fig_scatter = px.scatter(
         student_semester_filtered,
         x='semester',
@@ -1267,43 +736,10 @@ def refresh_stats():
     fig_scatter.update_layout(
         xaxis_title='Semester',
         yaxis_title='Average Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
-                xanchor="right",
-                y=0,
-                yanchor="top"
-            )
-        ]
+        updatemenus=ANIMATION_MENU
     )
     
     # ============= CHART 4: Subject Performance Animation =============
-    subject_semester_avg = df.groupby(['subject', 'semester'])['total'].mean().reset_index()
-    
     fig_bar = px.bar(
         subject_semester_avg,
         x='subject',
@@ -1316,49 +752,21 @@ def refresh_stats():
     fig_bar.update_layout(
         xaxis_title='Subject',
         yaxis_title='Average Marks',
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[None, {
-                            "frame": {"duration": 1000, "redraw": True},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {
-                            "frame": {"duration": 0, "redraw": False},
-                            "mode": "immediate",
-                            "fromcurrent": True
-                        }]
-                    )
-                ],
-                direction="left",
-                pad={"r": 10, "t": 87},
-                showactive=True,
-                x=0.1,
-                xanchor="right",
-                y=0,
-                yanchor="top"
-            )
-        ]
+        updatemenus=ANIMATION_MENU
     )
     
     # Prepare response with all chart data
-    return jsonify({
-        'avg_chart': json.dumps(fig_subject, cls=plotly.utils.PlotlyJSONEncoder),
-        'top_chart': json.dumps(fig_top, cls=plotly.utils.PlotlyJSONEncoder),
+    return {
+        'avg_chart': figure_json(fig_subject),
+        'top_chart': figure_json(fig_top),
         'animated_charts': {
-            'scatter': json.dumps(fig_scatter, cls=plotly.utils.PlotlyJSONEncoder),
-            'bar': json.dumps(fig_bar, cls=plotly.utils.PlotlyJSONEncoder)
+            'scatter': figure_json(fig_scatter),
+            'bar': figure_json(fig_bar)
         }
-    })
+    }
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True)
\ No newline at end of file
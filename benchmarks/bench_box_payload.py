@@ -0,0 +1,58 @@
+"""Subject box plot payload by cohort size: every mark vs the summarized box.
+
+Seeds an in-memory SQLite database for each cohort size (as bench_mark_loader
+does) and builds the staff subject box plot twice: the old
+boxpoints='all' trace over every mark, and staff_stats' quartiles, whiskers
+and capped outlier sample. Prints points shipped, JSON size and build time.
+
+    python benchmarks/bench_box_payload.py 100 1000 5000
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.graph_objects as go
+import plotly.utils
+from models import db
+from data_access import load_staff_marks
+from aggregates import rebuild_aggregates
+from staff_stats import BOX_POINTS, _subject_box_from_frame
+from app import subject_box_traces
+from bench_mark_loader import make_app, seed
+
+
+def all_points():
+    marks = load_staff_marks()
+    fig = go.Figure(go.Box(x=marks['subject'], y=marks['total'], boxpoints='all', jitter=0.3, pointpos=-1.8))
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder), len(marks)
+
+
+def summarized():
+    box, outliers = _subject_box_from_frame(load_staff_marks(), BOX_POINTS)
+    fig = go.Figure(subject_box_traces({'subject_box': box, 'subject_outliers': outliers}))
+    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder), len(outliers)
+
+
+def main(sizes):
+    print(f"{'students':>9} {'variant':>10} {'points':>8} {'KB':>9} {'ms':>8}")
+    for num_students in sizes:
+        app = make_app()
+        with app.app_context():
+            db.create_all()
+            seed(num_students)
+            with db.engine.begin() as connection:
+                rebuild_aggregates(connection)
+            for name, build in (('all', all_points), ('summary', summarized)):
+                start = time.perf_counter()
+                payload, points = build()
+                elapsed = time.perf_counter() - start
+                print(f'{num_students:>9} {name:>10} {points:>8} {len(payload) / 1024:>9.1f} {elapsed * 1000:>8.0f}')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000])
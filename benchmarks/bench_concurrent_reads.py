@@ -0,0 +1,182 @@
+"""Staff dashboard read throughput while a writer is active, per SQLite profile.
+
+Seeds one SQLite file with populate_db's bulk mode, then for each profile runs
+reader processes against /dashboard/staff/<id> for a fixed time while a
+writer process keeps committing batches of mark updates. The 'default' profile is
+SQLite's rollback journal with no pragmas and SQLAlchemy's default pool; 'tuned'
+is the SQLITE_PRAGMAS/SQLITE_POOL profile from config.py.
+
+    python benchmarks/bench_concurrent_reads.py --students 50 --readers 4 --duration 10
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from app import create_app
+from models import db, User
+
+PROFILES = {
+    'default': {'SQLITE_PRAGMAS': {}, 'SQLITE_POOL': {}},
+    'tuned': {},
+}
+
+
+def seed(path, num_students):
+    from populate_db import populate_db_bulk
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    try:
+        populate_db_bulk(num_students, seed=1)
+    finally:
+        del os.environ['FLASK_SQLALCHEMY_DATABASE_URI']
+    # Move everything out of the WAL so copies of the main file are complete
+    with sqlite3.connect(path) as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def writer(uri, overrides, stop, batch, stats):
+    """Rewrite `batch` marks per transaction until stopped."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, **overrides})
+    commits = errors = 0
+    with app.app_context():
+        total = db.session.scalar(text('SELECT count(*) FROM mark'))
+        offset = 0
+        while not stop.is_set():
+            try:
+                db.session.execute(
+                    text('UPDATE mark SET external = external WHERE rowid IN '
+                         '(SELECT rowid FROM mark LIMIT :batch OFFSET :offset)'),
+                    {'batch': batch, 'offset': offset}
+                )
+                db.session.commit()
+                commits += 1
+            except Exception:
+                db.session.rollback()
+                errors += 1
+            offset = (offset + batch) % max(total, 1)
+    stats.put((commits, errors))
+
+
+def reader(uri, overrides, url, start, stop, results):
+    """Request url until stopped; report (latencies of 200s, failed status codes)."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, **overrides})
+    client = app.test_client()
+    # Warm up imports outside the measurement
+    client.get(url).close()
+
+    # Time spent inside SQL statements, which is where lock waits show up
+    sql_time = [0.0]
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        sql_time[0] += time.perf_counter() - conn.info.pop('query_start')
+
+    start.wait()
+    latencies, sql_latencies, failures = [], [], []
+    while not stop.is_set():
+        sql_time[0] = 0.0
+        began = time.perf_counter()
+        response = client.get(url)
+        # The staff dashboard is streamed: time the whole page, and close the
+        # response so its generator releases the request context here
+        response.get_data()
+        response.close()
+        elapsed = time.perf_counter() - began
+        if response.status_code == 200:
+            latencies.append(elapsed)
+            sql_latencies.append(sql_time[0])
+        else:
+            failures.append(response.status_code)
+    results.put((latencies, sql_latencies, failures))
+
+
+def run_profile(path, overrides, args):
+    """Readers and the writer run in separate processes, like WSGI workers."""
+    uri = f'sqlite:///{path}'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri, **overrides})
+    with app.app_context():
+        staff_id = User.query.filter_by(role='staff').first().id
+        db.engine.dispose()
+    url = f'/dashboard/staff/{staff_id}'
+
+    context = multiprocessing.get_context('spawn')
+    start, stop = context.Event(), context.Event()
+    results, stats = context.Queue(), context.Queue()
+    readers = [context.Process(target=reader, args=(uri, overrides, url, start, stop, results))
+               for _ in range(args.readers)]
+    for process in readers:
+        process.start()
+    # Let every reader finish its warm-up request before the clock starts
+    time.sleep(args.warmup)
+    write_process = context.Process(target=writer, args=(uri, overrides, stop, args.write_batch, stats))
+    write_process.start()
+    start.set()
+    time.sleep(args.duration)
+    stop.set()
+
+    latencies, sql_latencies, failures = [], [], []
+    for _ in readers:
+        reader_latencies, reader_sql_latencies, reader_failures = results.get()
+        latencies += reader_latencies
+        sql_latencies += reader_sql_latencies
+        failures += reader_failures
+    commits, errors = stats.get()
+    for process in readers + [write_process]:
+        process.join()
+    return latencies, sql_latencies, failures, {'commits': commits, 'errors': errors}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values) or [0.0]
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50, help='students to seed (default: 50)')
+    parser.add_argument('--readers', type=int, default=4, help='concurrent reader processes (default: 4)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per profile (default: 10)')
+    parser.add_argument('--write-batch', type=int, default=5000,
+                        help='marks rewritten per writer transaction (default: 5000)')
+    parser.add_argument('--warmup', type=float, default=15,
+                        help='seconds allowed for reader start-up before measuring (default: 15)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+    try:
+        seeded = os.path.join(workdir, 'seed.db')
+        seed(seeded, args.students)
+
+        print(f"\n{'profile':>8} {'reads':>6} {'reads/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'sql p50':>8} {'sql p95':>8} {'failed':>7} {'commits':>8} {'w-errors':>9}")
+        for name, overrides in PROFILES.items():
+            path = os.path.join(workdir, f'{name}.db')
+            shutil.copyfile(seeded, path)
+            if name == 'default':
+                # WAL is persistent in the file; put the copy back in rollback-journal mode
+                with sqlite3.connect(path) as conn:
+                    conn.execute('PRAGMA journal_mode=delete')
+            latencies, sql_latencies, failures, write_stats = run_profile(path, overrides, args)
+            print(f'{name:>8} {len(latencies):>6} {len(latencies) / args.duration:>8.2f} '
+                  f'{percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f} '
+                  f'{percentile(sql_latencies, 0.5) * 1000:>8.1f} {percentile(sql_latencies, 0.95) * 1000:>8.1f} '
+                  f'{len(failures):>7} {write_stats["commits"]:>8} {write_stats["errors"]:>9}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
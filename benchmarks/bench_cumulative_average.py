@@ -0,0 +1,63 @@
+"""Compare the per-student expanding-mean loop with analytics.cumulative_average.
+
+Builds a (student, semester) average frame like staff_dashboard's Chart 9 for
+each cohort size and times both implementations. The vectorized version should
+grow linearly with the number of rows; the loop grows quadratically.
+
+    python benchmarks/bench_cumulative_average.py 1000 5000 20000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from analytics import cumulative_average
+
+SEMESTERS = 8
+
+
+def make_progress(num_students, rng):
+    return pd.DataFrame({
+        'student_id': np.repeat(np.arange(num_students), SEMESTERS).astype(str),
+        'semester': np.tile(np.arange(1, SEMESTERS + 1), num_students),
+        'total': rng.uniform(80, 100, size=num_students * SEMESTERS)
+    }).sort_values(['student_id', 'semester'])
+
+
+def loop_cumulative_average(student_progress):
+    """The loop staff_dashboard used before analytics.cumulative_average."""
+    student_progress = student_progress.copy()
+    for student_id in student_progress['student_id'].unique():
+        mask = student_progress['student_id'] == student_id
+        student_progress.loc[mask, 'cumulative_avg'] = student_progress.loc[mask, 'total'].expanding().mean().values
+    return student_progress['cumulative_avg']
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    print(f"{'students':>9} {'rows':>9} {'loop s':>9} {'vector s':>9} {'vector us/row':>14}")
+    for num_students in sizes:
+        progress = make_progress(num_students, rng)
+        vector, vector_time = timed(cumulative_average, progress, 'student_id', 'semester')
+        if num_students <= 5000:
+            loop, loop_time = timed(loop_cumulative_average, progress)
+            assert np.allclose(loop.values, vector.values)
+            loop_label = f'{loop_time:>9.3f}'
+        else:
+            # The loop takes minutes past this point
+            loop_label = f"{'skipped':>9}"
+        print(f'{num_students:>9} {len(progress):>9} {loop_label} {vector_time:>9.4f} '
+              f'{vector_time / len(progress) * 1e6:>14.3f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000, 20000, 100000])
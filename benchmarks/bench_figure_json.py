@@ -0,0 +1,83 @@
+"""Staff dashboard figure serialization: PlotlyJSONEncoder vs orjson.
+
+For each mark count, seeds an in-memory SQLite database (as bench_mark_loader
+does, 48 marks per student), renders /dashboard/staff/<id> once and keeps
+every figure it serializes. Then times the whole figure set with each
+serialization engine, checking that both decode to the same figures.
+
+    python benchmarks/bench_figure_json.py 1000 10000 100000
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import serialization
+from app import create_app
+from models import db, User
+from aggregates import rebuild_aggregates
+from bench_mark_loader import MARKS_PER_STUDENT, seed
+
+REPEATS = 5
+
+
+def staff_figures(num_marks):
+    """The figures the staff dashboard serializes for a seeded cohort."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        seed(max(1, -(-num_marks // MARKS_PER_STUDENT)))
+        staff = User(name='Staff', role='staff')
+        db.session.add(staff)
+        db.session.commit()
+        with db.engine.begin() as connection:
+            rebuild_aggregates(connection)
+        url = f'/dashboard/staff/{staff.id}'
+
+    figures = []
+    def capture(fig):
+        figures.append(fig)
+        return serialization.figure_json(fig)
+
+    app_module.figure_json = capture
+    try:
+        response = app.test_client().get(url)
+        assert response.status_code == 200, response.status_code
+        response.get_data()
+    finally:
+        app_module.figure_json = serialization.figure_json
+    return figures
+
+
+def best_of(engine, figures):
+    encode = serialization.ENGINES[engine]
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        payload = [encode(fig) for fig in figures]
+        timings.append(time.perf_counter() - start)
+    return min(timings), payload
+
+
+def main(sizes):
+    engines = ['json']
+    if serialization.resolve_engine('auto') == 'orjson':
+        engines.append('orjson')
+    else:
+        print('orjson is not installed; timing the json engine only\n')
+    print(f"{'marks':>8} {'figures':>8} {'engine':>7} {'KB':>8} {'ms':>8} {'speedup':>8}")
+    for num_marks in sizes:
+        figures = staff_figures(num_marks)
+        results = {engine: best_of(engine, figures) for engine in engines}
+        baseline, reference = results['json']
+        for engine, (elapsed, payload) in results.items():
+            assert [json.loads(plot) for plot in payload] == [json.loads(plot) for plot in reference], engine
+            size = sum(len(plot) for plot in payload) / 1024
+            print(f'{num_marks:>8} {len(figures):>8} {engine:>7} {size:>8.1f} {elapsed * 1000:>8.1f} '
+                  f'{baseline / elapsed:>7.1f}x')
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,103 @@
+"""Mark sheet import throughput: per-row ORM upserts vs mark_import.
+
+For each sheet size, seeds an in-memory SQLite database (as bench_mark_loader
+does, 48 marks per student) and builds a CSV sheet that regrades half of
+every student's marks and adds as many new ones. The sheet is then imported:
+
+- row by row through the ORM, one commit per mark, the way a naive upload
+  endpoint would (timed on the first PER_ROW_SAMPLE rows only);
+- with mark_import.import_marks, in chunked transactions.
+
+Prints rows/s for both, the import's phase timings, and whether
+aggregates.audit_aggregates finds the rollups and CGPAs consistent afterwards.
+
+    python benchmarks/bench_mark_import.py 10000 50000 100000
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Student, Mark
+from aggregates import rebuild_aggregates, audit_aggregates
+from mark_import import import_marks
+from bench_mark_loader import MARKS_PER_STUDENT, seed
+
+PER_ROW_SAMPLE = 1000
+
+
+def seeded_app(num_students):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        seed(num_students)
+        with db.engine.begin() as connection:
+            rebuild_aggregates(connection)
+    return app
+
+
+def mark_sheet(reg_nos):
+    """Sheet rows: half of each student's subjects regraded, half new."""
+    rows = []
+    for reg_no in reg_nos:
+        for j in range(MARKS_PER_STUDENT):
+            subject = f'Subject {j}' if j % 2 else f'Elective {j}'
+            internal, external = random.randint(30, 50), random.randint(30, 50)
+            rows.append((reg_no, j // 6 + 1, subject, internal, external))
+    return rows
+
+
+def as_csv(rows):
+    lines = ['reg_no,semester,subject,internal,external']
+    lines += [','.join(map(str, row)) for row in rows]
+    return io.BytesIO('\n'.join(lines).encode('utf-8'))
+
+
+def per_row(rows):
+    """Upsert rows one ORM commit at a time; returns seconds."""
+    students = dict(db.session.execute(db.select(Student.reg_no, Student.id)).all())
+    start = time.perf_counter()
+    for reg_no, semester, subject, internal, external in rows:
+        student_id = students[reg_no]
+        mark = Mark.query.filter_by(student_id=student_id, semester=semester, subject=subject).first()
+        if mark is None:
+            mark = Mark(student_id=student_id, semester=semester, subject=subject)
+            db.session.add(mark)
+        mark.internal, mark.external, mark.total = internal, external, internal + external
+        db.session.commit()
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'path':>8} {'seconds':>8} {'rows/s':>9}  details")
+    for num_rows in sizes:
+        num_students = max(1, num_rows // MARKS_PER_STUDENT)
+
+        app = seeded_app(num_students)
+        with app.app_context():
+            reg_nos = [reg_no for (reg_no,) in db.session.execute(db.select(Student.reg_no))]
+            rows = mark_sheet(reg_nos)[:PER_ROW_SAMPLE]
+            elapsed = per_row(rows)
+            print(f'{num_rows:>8} {"per-row":>8} {elapsed:>8.2f} {len(rows) / elapsed:>9,.0f}  '
+                  f'first {len(rows)} rows, one commit each')
+            db.session.remove()
+
+        app = seeded_app(num_students)
+        with app.app_context():
+            reg_nos = [reg_no for (reg_no,) in db.session.execute(db.select(Student.reg_no))]
+            report = import_marks(as_csv(mark_sheet(reg_nos)), 'csv', app.config['MARK_IMPORT_CHUNK_SIZE'])
+            consistent = not audit_aggregates(db.session.connection())
+            seconds = report['seconds']
+            print(f"{report['rows']:>8} {'bulk':>8} {seconds['total']:>8.2f} {report['rows_per_second']:>9,}  "
+                  f"parse {seconds['parse']:.2f}s, validate {seconds['validate']:.2f}s, write {seconds['write']:.2f}s; "
+                  f"{report['inserted']} inserted, {report['updated']} updated in {report['chunks']} chunks; "
+                  f"audit {'ok' if consistent else 'FAILED'}")
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000])
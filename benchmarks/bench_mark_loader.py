@@ -0,0 +1,110 @@
+"""Compare the legacy per-row ORM mark loader with data_access.load_staff_marks.
+
+Seeds an in-memory SQLite database for each cohort size and reports how many
+SQL statements each loader issues and how long it takes.
+
+    python benchmarks/bench_mark_loader.py 100 1000 5000
+"""
+import os
+import sys
+import time
+import uuid
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from flask import Flask
+from sqlalchemy import event, insert
+from models import db, User, Student, Mark
+from data_access import load_staff_marks
+
+MARKS_PER_STUDENT = 48
+DEPARTMENTS = ['Computer Science', 'Information Technology', 'Electronics', 'Mechanical', 'Civil']
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def seed(num_students):
+    users, students, marks = [], [], []
+    for i in range(num_students):
+        user_id, student_id = uuid.uuid4(), uuid.uuid4()
+        users.append({'id': user_id, 'name': f'Student {i}', 'role': 'student'})
+        students.append({
+            'id': student_id,
+            'user_id': user_id,
+            'reg_no': f'2024{i:06d}',
+            'department': random.choice(DEPARTMENTS),
+            'semester': 8
+        })
+        for j in range(MARKS_PER_STUDENT):
+            internal, external = random.randint(40, 50), random.randint(40, 50)
+            marks.append({
+                'id': uuid.uuid4(),
+                'student_id': student_id,
+                'semester': j // 6 + 1,
+                'subject': f'Subject {j}',
+                'internal': internal,
+                'external': external,
+                'total': internal + external
+            })
+    db.session.execute(insert(User), users)
+    db.session.execute(insert(Student), students)
+    db.session.execute(insert(Mark), marks)
+    db.session.commit()
+
+
+def legacy_loader():
+    """The loader staff_dashboard used before data_access existed."""
+    return pd.DataFrame([{
+        'student_id': str(m.student.id),
+        'student_name': m.student.user.name,
+        'subject': m.subject,
+        'internal': float(m.internal),
+        'external': float(m.external),
+        'total': float(m.total),
+        'semester': m.semester,
+        'department': m.student.department
+    } for m in Mark.query.all()])
+
+
+def measure(loader):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        # Start from an empty identity map so both loaders pay for every object
+        db.session.expunge_all()
+        start = time.perf_counter()
+        df = loader()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return len(df), len(statements), elapsed
+
+
+def main(sizes):
+    print(f"{'students':>9} {'marks':>9} {'loader':>8} {'queries':>9} {'seconds':>9}")
+    for num_students in sizes:
+        app = make_app()
+        with app.app_context():
+            db.create_all()
+            seed(num_students)
+            for name, loader in (('legacy', legacy_loader), ('joined', load_staff_marks)):
+                rows, queries, elapsed = measure(loader)
+                print(f'{num_students:>9} {rows:>9} {name:>8} {queries:>9} {elapsed:>9.3f}')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 500, 2000])
@@ -0,0 +1,85 @@
+"""Measure how long `import app` takes and check it against a budget.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports the
+median cumulative import time of app.py and the slowest top-level imports, and
+fails if the median is over budget or if any of the lazily imported chart,
+network or streaming backends got loaded at import.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 800
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the routes that need these may import them
+LAZY_MODULES = ('pandas', 'numpy', 'plotly', 'pyvis', 'networkx', 'bokeh', 'tornado')
+
+
+def import_times():
+    """Cumulative microseconds of app.py and of each module it imports directly.
+
+    Returns (app_total, {module: cumulative microseconds}).
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level and are listed
+        # before the module that triggered them
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == 'app':
+                return int(cumulative), children
+            children = {}
+    raise RuntimeError('no import time reported for app')
+
+
+def loaded_lazy_modules():
+    result = subprocess.run(
+        [sys.executable, '-c', 'import sys, app; print(" ".join(sorted(sys.modules)))'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = set(result.stdout.split())
+    return [name for name in LAZY_MODULES if name in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time (default: 5)')
+    parser.add_argument('--budget-ms', type=float, default=800,
+                        help='maximum median import time of app.py in ms (default: 800)')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to list (default: 10)')
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    median = statistics.median(total for total, _ in runs) / 1000
+    print(f'import app: median {median:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)')
+
+    slowest = sorted(runs[-1][1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for name, micros in slowest:
+        print(f'  {micros / 1000:>8.1f} ms  {name}')
+
+    failures = 0
+    if median > args.budget_ms:
+        print(f'FAIL: import time is over budget by {median - args.budget_ms:.0f} ms')
+        failures += 1
+    eager = loaded_lazy_modules()
+    if eager:
+        print(f'FAIL: loaded at import: {", ".join(eager)}')
+        failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Per-figure cost of the student chart pipeline.
+
+Seeds an in-memory SQLite database (as bench_mark_loader does), builds every
+student's nine figures cold and then again from the memo, and prints
+charts.figure_timings' report: builds, memo hits and mean build and
+serialization time per figure, slowest first.
+
+    python benchmarks/bench_student_charts.py 20
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Student
+from data_access import student_mark_rows
+from cache import LRUCache
+from charts import StudentCharts, FigureTimings
+from bench_mark_loader import make_app, seed
+
+
+def main(num_students):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        seed(num_students)
+        rows = [student_mark_rows(student.id) for student in Student.query.all()]
+
+    cache, timings = LRUCache(maxsize=len(rows) * 9), FigureTimings()
+    # Warm up imports outside the measurement
+    StudentCharts(rows[0], LRUCache(maxsize=9), FigureTimings()).figures()
+
+    for label in ('cold', 'memoized'):
+        start = time.perf_counter()
+        for student_rows in rows:
+            StudentCharts(student_rows, cache, timings).figures()
+        elapsed = time.perf_counter() - start
+        print(f'{label:>9}: {len(rows)} students in {elapsed:.2f}s ({elapsed / len(rows) * 1000:.1f} ms each)')
+
+    print(f"\n{'figure':>13} {'builds':>7} {'hits':>6} {'build ms':>9} {'json ms':>8} {'total ms':>9}")
+    for name, entry in timings.report().items():
+        print(f"{name:>13} {entry['builds']:>7} {entry['hits']:>6} {entry['mean_build_ms']:>9.1f} "
+              f"{entry['mean_serialize_ms']:>8.1f} {entry['total_ms']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,57 @@
+"""Compare the full groupby + nlargest top-10 with aggregates.top_students.
+
+Seeds an in-memory SQLite database for each cohort size (as
+bench_mark_loader does), builds the StudentTotal rollup and times the top 10
+overall and for one semester both ways.
+
+    python benchmarks/bench_top_students.py 100 1000 5000
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from data_access import load_staff_marks
+from aggregates import rebuild_aggregates, top_students
+from bench_mark_loader import make_app, seed
+
+REPEATS = 5
+
+
+def groupby_top(semester=None, limit=10):
+    """How the dashboards ranked students before StudentTotal."""
+    df = load_staff_marks(semester)
+    return df.groupby(['student_id', 'student_name'])['total'].mean().round(2).nlargest(limit)
+
+
+def best_of(run):
+    timings = []
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes):
+    print(f"{'students':>9} {'scope':>9} {'groupby ms':>11} {'index ms':>9}")
+    for num_students in sizes:
+        app = make_app()
+        with app.app_context():
+            db.create_all()
+            seed(num_students)
+            with db.engine.begin() as connection:
+                rebuild_aggregates(connection)
+            for scope, semester in (('overall', None), ('semester', 3)):
+                legacy = best_of(lambda: groupby_top(semester))
+                indexed = best_of(lambda: top_students(10, semester))
+                print(f'{num_students:>9} {scope:>9} {legacy * 1000:>11.1f} {indexed * 1000:>9.2f}')
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000])
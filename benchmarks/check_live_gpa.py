@@ -0,0 +1,64 @@
+"""Check that live GPA sessions open after marks change CGPAs.
+
+Seeds an in-memory SQLite database (as bench_mark_loader does), rewrites one
+mark of each of a few students through the ORM so their CGPAs move and reach
+the change feed, then starts a BokehHost on a free port and opens a client
+session on it, as a browser visiting /live-gpa would. Exits non-zero unless
+the session's document carries the streamed CGPA points.
+
+    python benchmarks/check_live_gpa.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bokeh.client import pull_session
+from bokeh.models import GlyphRenderer, Line
+from app import create_app
+from models import db, Student, Mark
+from aggregates import rebuild_aggregates
+from bokeh_host import BokehHost
+from change_feed import feed
+from bench_mark_loader import seed
+
+STUDENTS = 3
+
+
+def change_cgpas():
+    """Lower one mark of the first STUDENTS students; returns the CGPA events published."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        seed(STUDENTS)
+        with db.engine.begin() as connection:
+            rebuild_aggregates(connection)
+        cursor = feed.latest()
+        for student in Student.query.order_by(Student.reg_no).limit(STUDENTS):
+            mark = Mark.query.filter_by(student_id=student.id).order_by(Mark.subject).first()
+            mark.total = 0 if mark.total else 100
+            db.session.commit()
+    events, _ = feed.since(cursor)
+    return [item for item in events if item.kind == 'cgpa']
+
+
+def main():
+    published = change_cgpas()
+    print(f'{len(published)} CGPA changes published')
+    host = BokehHost(port=0).start()
+    try:
+        with pull_session(url=host.url) as session:
+            renderers = session.document.select({'type': GlyphRenderer})
+            line = next(renderer for renderer in renderers if isinstance(renderer.glyph, Line))
+            streamed = len(line.data_source.data['y'])
+    finally:
+        host.stop()
+    print(f'live session opened; {streamed} points in its CGPA line')
+    if not published or streamed < len(published):
+        print('FAIL: CGPA changes missing from the live session')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
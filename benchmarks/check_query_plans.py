@@ -0,0 +1,102 @@
+"""Check that every hot lookup query is answered from an index.
+
+Runs each query against an in-memory database with the current schema,
+captures the SQL actually sent to SQLite and prints its EXPLAIN QUERY PLAN.
+Exits non-zero if any of them falls back to a full table scan (scans of a
+materialized top-N subquery are fine).
+
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, User, Student, Mark, Mentorship
+from data_access import load_staff_marks, mentees_of
+from aggregates import top_students, student_kpis, cohort_gpa
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def seed():
+    staff = User(id=uuid.uuid4(), name='Prof. Example', role='staff')
+    user = User(id=uuid.uuid4(), name='Example Student', role='student')
+    student = Student(id=uuid.uuid4(), user_id=user.id, reg_no='20240001', department='Civil', semester=1)
+    db.session.add_all([staff, user, student])
+    db.session.flush()
+    db.session.add(Mark(id=uuid.uuid4(), student_id=student.id, semester=1, subject='Physics',
+                        internal=45, external=45, total=90))
+    db.session.add(Mentorship(staff_id=staff.id, student_id=student.id))
+    ids = staff.id, user.id, user.name, student.id
+    db.session.commit()
+    return ids
+
+
+def hot_queries(staff_id, user_id, user_name, student_id):
+    """Name -> callable issuing the query as the app does."""
+    return {
+        'login (name + role)': lambda: User.query.filter_by(name=user_name, role='student').first(),
+        'staff listing (role)': lambda: User.query.filter_by(role='staff').all(),
+        'user.student (user_id)': lambda: Student.query.filter_by(user_id=user_id).first(),
+        'student marks (student_id)': lambda: Mark.query.filter_by(student_id=student_id).all(),
+        'student semester marks (student_id + semester)':
+            lambda: Mark.query.filter_by(student_id=student_id, semester=1).all(),
+        'staff marks for one semester': lambda: load_staff_marks(1),
+        'students by department': lambda: Student.query.filter_by(department='Civil').all(),
+        'mentees of staff (staff_id)': lambda: mentees_of(staff_id),
+        'mentors of student (student_id)': lambda: Mentorship.query.filter_by(student_id=student_id).all(),
+        'top students overall': lambda: top_students(10),
+        'top students for one semester': lambda: top_students(10, semester=1),
+        'top students of a department': lambda: top_students(10, department='Civil'),
+        'student KPIs (student_id)': lambda: student_kpis(student_id),
+        'cohort average': cohort_gpa,
+    }
+
+
+def capture(query):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        db.session.expunge_all()
+        query()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def main():
+    failures = 0
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        for name, query in hot_queries(*seed()).items():
+            for statement, parameters in capture(query):
+                plan = [row[3] for row in db.session.connection().exec_driver_sql(
+                    'EXPLAIN QUERY PLAN ' + statement, parameters
+                )]
+                # Scanning a materialized LIMIT subquery only walks its few rows
+                subqueries = {step.split()[1] for step in plan if step.startswith(('MATERIALIZE', 'CO-ROUTINE'))}
+                scans = [step for step in plan if step.startswith('SCAN') and step.split()[1] not in subqueries]
+                status = 'FAIL' if scans else 'ok'
+                failures += bool(scans)
+                print(f'[{status}] {name}')
+                for step in plan:
+                    print(f'       {step}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
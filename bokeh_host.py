@@ -0,0 +1,164 @@
+"""Live GPA stream served by an embedded Bokeh server.
+
+Nothing here runs at import time. BokehHost starts the server on its own
+IOLoop thread the first time it is needed, all sessions share that one loop,
+and stop() (also registered with atexit) shuts it down cleanly.
+"""
+import atexit
+import threading
+from bokeh.application import Application
+from bokeh.application.handlers import FunctionHandler
+from bokeh.layouts import column
+from bokeh.models import ColumnDataSource, Div
+from bokeh.plotting import figure
+from bokeh.server.server import Server
+from tornado.ioloop import IOLoop
+from change_feed import feed
+
+# Points kept per series in the live GPA stream
+BOKEH_ROLLOVER = 20
+
+# Milliseconds between stream updates
+UPDATE_INTERVAL = 500
+
+
+def create_bokeh_app(host):
+    # Create a Bokeh app streaming committed CGPA and mark changes
+    def modify_doc(doc):
+        if not host.acquire_session():
+            doc.add_root(Div(text='The live GPA stream is at capacity. Please try again later.'))
+            return
+        doc.on_session_destroyed(lambda session_context: host.release_session())
+
+        p = figure(title="Live GPA Stream", x_axis_label="Time", y_axis_label="GPA",
+                  x_axis_type='datetime', width=600, height=400)
+
+        # CGPA updates as a line, mark entries as points on the same 10-point scale
+        cgpa_source = ColumnDataSource(data=dict(x=[], y=[], label=[]))
+        mark_source = ColumnDataSource(data=dict(x=[], y=[], label=[]))
+        p.line('x', 'y', source=cgpa_source, line_width=2, legend_label='CGPA')
+        p.scatter('x', 'y', source=mark_source, size=6, color='#e67e22', legend_label='Mark / 10')
+
+        # Start with the recent history still in the feed
+        cursor = max(0, feed.latest() - BOKEH_ROLLOVER * 2)
+
+        def update():
+            nonlocal cursor
+            events, cursor = feed.since(cursor)
+            batches = {'cgpa': dict(x=[], y=[], label=[]), 'mark': dict(x=[], y=[], label=[])}
+            for item in events:
+                batch = batches[item.kind]
+                batch['x'].append(item.timestamp * 1000)
+                batch['y'].append(item.value if item.kind == 'cgpa' else item.value / 10)
+                batch['label'].append(item.label)
+            # One stream() per source per tick, however many commits arrived
+            for source, batch in ((cgpa_source, batches['cgpa']), (mark_source, batches['mark'])):
+                if batch['x']:
+                    source.stream(batch, rollover=BOKEH_ROLLOVER)
+
+        update()
+        doc.add_periodic_callback(update, UPDATE_INTERVAL)
+
+        # Add to document
+        doc.add_root(column(p))
+
+    return Application(FunctionHandler(modify_doc))
+
+
+class BokehHost:
+    """Lazily started Bokeh server for the live GPA stream.
+
+    ``port=0`` picks a free port; if the configured port is taken the host
+    falls back to a free one. At most ``max_sessions`` browser sessions are
+    streamed at once, later ones get a notice instead of a plot.
+    """
+
+    def __init__(self, port=5006, max_sessions=50, allow_websocket_origin=None):
+        self.port = port
+        self.max_sessions = max_sessions
+        self.allow_websocket_origin = allow_websocket_origin
+        self.sessions = 0
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._server is not None
+
+    @property
+    def url(self):
+        return f'http://localhost:{self.port}/bokeh'
+
+    def acquire_session(self):
+        with self._lock:
+            if self.sessions >= self.max_sessions:
+                return False
+            self.sessions += 1
+            return True
+
+    def release_session(self):
+        with self._lock:
+            self.sessions = max(0, self.sessions - 1)
+
+    def start(self):
+        """Start the server thread if it isn't running; returns once the port is bound."""
+        with self._lock:
+            if self._server is not None:
+                return self
+            ready = threading.Event()
+            failure = []
+
+            def run():
+                loop = IOLoop()
+                try:
+                    server = self._bind(loop)
+                except Exception as e:
+                    failure.append(e)
+                    loop.close()
+                    ready.set()
+                    return
+                self._server = server
+                self.port = server.port
+                server.start()
+                ready.set()
+                loop.start()
+                loop.close()
+
+            self._thread = threading.Thread(target=run, name='bokeh-host', daemon=True)
+            self._thread.start()
+            ready.wait()
+            if failure:
+                self._thread = None
+                raise failure[0]
+            atexit.register(self.stop)
+            return self
+
+    def _bind(self, loop):
+        options = {'io_loop': loop, 'num_procs': 1}
+        if self.allow_websocket_origin:
+            options['allow_websocket_origin'] = self.allow_websocket_origin
+        try:
+            return Server({'/bokeh': create_bokeh_app(self)}, port=self.port, **options)
+        except OSError:
+            if not self.port:
+                raise
+            print(f"Warning: Bokeh port {self.port} is in use. Trying with a random port...")
+            return Server({'/bokeh': create_bokeh_app(self)}, port=0, **options)
+
+    def stop(self):
+        """Stop the server and its IOLoop thread; safe to call more than once."""
+        with self._lock:
+            server, thread = self._server, self._thread
+            self._server = self._thread = None
+        if server is None:
+            return
+        loop = server.io_loop
+
+        def shutdown():
+            server.stop()
+            loop.stop()
+
+        loop.add_callback(shutdown)
+        thread.join(timeout=5)
+        atexit.unregister(self.stop)
@@ -0,0 +1,170 @@
+"""Result caching keyed on a data version shared by every process.
+
+The data version is a set of per-model counters stored in the DataVersion
+table. A transaction that writes a User, Student, Mark or Mentorship through
+the ORM bumps them just before it commits, in the same transaction, so the
+new version becomes visible to every worker, CLI command and script exactly
+when the data does. Callers put data_version() in their cache keys so stale
+entries are never served, and registered caches are cleared when this
+process first sees the version move so they don't hold dead entries until
+eviction.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, select
+from models import db, User, Student, Mark, Mentorship, DataVersion
+from database import accumulating_insert
+
+# Models whose writes change what the dashboards show
+TRACKED_MODELS = (User, Student, Mark, Mentorship)
+
+
+class LRUCache:
+    """Thread-safe least-recently-used mapping with hit/miss counters.
+
+    Bounded by entry count and, when ``maxbytes`` is given, by the total
+    ``sizeof(value)`` of the entries.
+    """
+
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        with self._lock:
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize, maxbytes=None):
+        """Change the bounds, evicting least-recently-used entries to fit."""
+        with self._lock:
+            self.maxsize = maxsize
+            self.maxbytes = maxbytes
+            self._evict()
+
+    def _evict(self):
+        while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+            evicted, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(evicted)
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for key, building it with factory() on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'bytes': self.nbytes,
+                'maxbytes': self.maxbytes
+            }
+
+
+def content_hash(rows):
+    """Stable digest of query rows, for keying caches on the data itself."""
+    return hashlib.blake2b(repr(rows).encode('utf-8'), digest_size=16).hexdigest()
+
+
+_caches = []
+# Versions this process last read; registered caches are cleared when they move
+_seen_versions = None
+_seen_lock = threading.Lock()
+
+
+def data_version(*models):
+    """Current version of the tracked data, read from the database.
+
+    With no arguments this covers every tracked model; otherwise only writes
+    to the given models move it.
+    """
+    global _seen_versions
+    table = DataVersion.__table__
+    versions = dict(db.session.execute(select(table.c.name, table.c.version)).all())
+    with _seen_lock:
+        moved = versions != _seen_versions
+        _seen_versions = versions
+    if moved:
+        for cache in _caches:
+            cache.clear()
+    names = [model.__name__ for model in models or TRACKED_MODELS]
+    return sum(versions.get(name, 0) for name in names)
+
+
+def bump_data_version(connection, *models):
+    """Move the version of ``models`` (default: all) in connection's transaction.
+
+    Called automatically before ORM commits; bulk writes that bypass the ORM
+    must call it themselves, on the connection and in the transaction that
+    writes. Every process sees the new version once that transaction commits.
+    """
+    names = sorted(model.__name__ for model in models or TRACKED_MODELS)
+    connection.execute(
+        accumulating_insert(connection, DataVersion.__table__, ['name'], ['version']),
+        [{'name': name, 'version': 1} for name in names]
+    )
+
+
+def register_cache(cache):
+    """Clear cache whenever the data version changes."""
+    _caches.append(cache)
+    return cache
+
+
+@event.listens_for(db.session, 'after_flush')
+def _note_tracked_writes(session, flush_context):
+    changed = session.info.setdefault('changed_models', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, TRACKED_MODELS):
+            changed.add(type(obj))
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_before_commit(session):
+    # Flush now so that the writes the commit would still flush are counted
+    session.flush()
+    changed = session.info.pop('changed_models', None)
+    if changed:
+        bump_data_version(session.connection(), *changed)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _forget_on_rollback(session, previous_transaction):
+    session.info.pop('changed_models', None)
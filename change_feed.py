@@ -0,0 +1,84 @@
+"""In-process feed of committed CGPA and mark changes.
+
+An after_flush hook records the Mark totals a transaction writes, and
+aggregates records the Student CGPAs it recomputes from them; after_commit
+publishes both to a single bounded buffer (rolled-back transactions publish
+nothing). Readers such as the live Bokeh stream keep a
+cursor into the buffer and pull everything newer on each tick, so any number
+of sessions share one feed without touching the database.
+"""
+import itertools
+import threading
+import time
+from collections import deque, namedtuple
+from sqlalchemy import event, inspect
+from models import db, Mark
+
+# kind is 'cgpa' or 'mark'; label is the student's reg_no or the mark's subject
+FeedEvent = namedtuple('FeedEvent', 'seq timestamp kind label value')
+
+
+class ChangeFeed:
+    """Thread-safe ring buffer of FeedEvents with increasing sequence numbers."""
+
+    def __init__(self, maxlen=1000):
+        self._events = deque(maxlen=maxlen)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, changes, timestamp=None):
+        """Append (kind, label, value) changes, all stamped with one commit time."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for kind, label, value in changes:
+                self._events.append(FeedEvent(next(self._seq), timestamp, kind, label, value))
+
+    def latest(self):
+        """Sequence number of the newest event, or 0 if nothing was published."""
+        with self._lock:
+            return self._events[-1].seq if self._events else 0
+
+    def since(self, cursor, limit=None):
+        """Events newer than cursor (oldest first) and the cursor to pass next time.
+
+        With ``limit`` only the newest ``limit`` of them are returned; readers
+        that fell behind skip ahead instead of replaying the whole buffer.
+        """
+        with self._lock:
+            events = [item for item in self._events if item.seq > cursor]
+        if limit is not None:
+            events = events[-limit:] if limit else []
+        return events, (events[-1].seq if events else cursor)
+
+
+feed = ChangeFeed()
+
+
+def _changed(obj, attribute):
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
+def record(session, changes):
+    """Queue (kind, label, value) changes to publish when session commits."""
+    session.info.setdefault('feed_changes', []).extend(changes)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    record(session, [
+        ('mark', obj.subject, obj.total)
+        for obj in session.new | session.dirty
+        if isinstance(obj, Mark) and obj.total is not None and (obj in session.new or _changed(obj, 'total'))
+    ])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_on_commit(session):
+    changes = session.info.pop('feed_changes', None)
+    if changes:
+        feed.publish(changes)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop('feed_changes', None)
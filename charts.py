@@ -0,0 +1,341 @@
+"""Student dashboard chart pipeline and shared Plotly figure settings.
+
+StudentCharts turns one student's mark rows into the nine dashboard figures.
+Each figure is built only when asked for, serialized once and memoized per
+(marks hash, figure name), so the dashboard, the refresh API and single-chart
+requests share the same entries. Every build is timed in figure_timings,
+which reports per-figure build and serialization cost.
+"""
+import threading
+import time
+from cache import LRUCache, content_hash
+from analytics import cumulative_average
+from data_access import STUDENT_MARK_COLUMNS
+from serialization import figure_json
+
+# Play/pause buttons shared by every animated chart
+ANIMATION_MENU = [
+    dict(
+        type="buttons",
+        buttons=[
+            dict(
+                label="Play",
+                method="animate",
+                args=[None, {
+                    "frame": {"duration": 1000, "redraw": True},
+                    "mode": "immediate",
+                    "fromcurrent": True
+                }]
+            ),
+            dict(
+                label="Pause",
+                method="animate",
+                args=[[None], {
+                    "frame": {"duration": 0, "redraw": False},
+                    "mode": "immediate",
+                    "fromcurrent": True
+                }]
+            )
+        ],
+        direction="left",
+        pad={"r": 10, "t": 87},
+        showactive=True,
+        x=0.1,
+        xanchor="right",
+        y=0,
+        yanchor="top"
+    )
+]
+
+
+class FigureTimings:
+    """Per-figure build and serialization times, plus memo hits."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name):
+        return self._stats.setdefault(name, {'builds': 0, 'hits': 0, 'build_s': 0.0, 'serialize_s': 0.0})
+
+    def record(self, name, build_s, serialize_s):
+        with self._lock:
+            entry = self._entry(name)
+            entry['builds'] += 1
+            entry['build_s'] += build_s
+            entry['serialize_s'] += serialize_s
+
+    def hit(self, name):
+        with self._lock:
+            self._entry(name)['hits'] += 1
+
+    def report(self):
+        """{figure: {builds, hits, mean_build_ms, mean_serialize_ms, total_ms}}, slowest first."""
+        with self._lock:
+            stats = {name: dict(entry) for name, entry in self._stats.items()}
+        report = {}
+        for name, entry in sorted(stats.items(), key=lambda item: -(item[1]['build_s'] + item[1]['serialize_s'])):
+            builds = entry['builds'] or 1
+            report[name] = {
+                'builds': entry['builds'],
+                'hits': entry['hits'],
+                'mean_build_ms': round(entry['build_s'] / builds * 1000, 2),
+                'mean_serialize_ms': round(entry['serialize_s'] / builds * 1000, 2),
+                'total_ms': round((entry['build_s'] + entry['serialize_s']) * 1000, 2)
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+figure_timings = FigureTimings()
+
+# Serialized student figures keyed by (hash of the marks, figure name)
+student_figure_cache = LRUCache(
+    maxsize=8192,
+    maxbytes=64 * 1024 * 1024,
+    sizeof=len
+)
+
+
+def _grade_point(totals):
+    """Mean of the totals on a 10-point scale (0 without marks)."""
+    return sum(totals) / (len(totals) * 100) * 10 if totals else 0
+
+
+class StudentCharts:
+    """The student dashboard figures for one set of mark rows.
+
+    ``rows`` are tuples in STUDENT_MARK_COLUMNS order, e.g. from
+    data_access.student_mark_rows. Nothing is imported or built until a
+    figure that isn't memoized is requested.
+    """
+
+    def __init__(self, rows, cache=student_figure_cache, timings=figure_timings):
+        self.rows = rows
+        self.key = content_hash(rows)
+        self.cache = cache
+        self.timings = timings
+        self._df = None
+        self.current_semester = max((row[0] for row in rows), default=0)
+
+    @property
+    def df(self):
+        if self._df is None:
+            import pandas as pd
+            self._df = pd.DataFrame.from_records(self.rows, columns=STUDENT_MARK_COLUMNS)
+        return self._df
+
+    def figure_json(self, name):
+        """One figure serialized to JSON, built on a memo miss."""
+        builder = FIGURES[name]
+        missing = object()
+        plot = self.cache.get((self.key, name), missing)
+        if plot is not missing:
+            self.timings.hit(name)
+            return plot
+        start = time.perf_counter()
+        fig = builder(self)
+        built = time.perf_counter()
+        plot = figure_json(fig)
+        self.timings.record(name, built - start, time.perf_counter() - built)
+        self.cache.set((self.key, name), plot)
+        return plot
+
+    def figures(self, names=None):
+        """{name: figure JSON} for the given figures (all when None)."""
+        return {name: self.figure_json(name) for name in (names or FIGURES)}
+
+
+# 1. Grouped Bar Chart (Internal vs External)
+def _bar(charts):
+    import plotly.express as px
+    fig = px.bar(
+        charts.df,
+        x='subject',
+        y=['internal', 'external'],
+        title='Internal vs External Marks by Subject',
+        barmode='group',
+        color_discrete_sequence=['#2ecc71', '#3498db']
+    )
+    fig.update_layout(
+        xaxis_title='Subject',
+        yaxis_title='Marks',
+        template='plotly_white'
+    )
+    return fig
+
+
+# 2. Line Chart (CGPA Trend)
+def _line(charts):
+    import plotly.express as px
+    semester_gpa = charts.df.groupby('semester')['total'].mean().reset_index()
+    semester_gpa['gpa'] = semester_gpa['total'] / 10
+    fig = px.line(
+        semester_gpa,
+        x='semester',
+        y='gpa',
+        title='CGPA Trend Across Semesters',
+        markers=True
+    )
+    fig.update_layout(
+        xaxis_title='Semester',
+        yaxis_title='GPA',
+        template='plotly_white'
+    )
+    return fig
+
+
+# 3. Donut Chart (CGPA Gauge)
+def _donut(charts):
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=_grade_point([row[4] for row in charts.rows]),
+        title={'text': "CGPA"},
+        gauge={
+            'axis': {'range': [0, 10]},
+            'bar': {'color': "#2ecc71"},
+            'steps': [
+                {'range': [0, 6], 'color': "#e74c3c"},
+                {'range': [6, 8], 'color': "#f1c40f"},
+                {'range': [8, 10], 'color': "#2ecc71"}
+            ]
+        }
+    ))
+    fig.update_layout(template='plotly_white')
+    return fig
+
+
+# 4. Heatmap
+def _heatmap(charts):
+    import plotly.express as px
+    pivot_df = charts.df.pivot(index='subject', columns='semester', values='total')
+    fig = px.imshow(
+        pivot_df,
+        title='Marks Heatmap (Subjects × Semesters)',
+        color_continuous_scale='RdYlGn'
+    )
+    fig.update_layout(
+        xaxis_title='Semester',
+        yaxis_title='Subject',
+        template='plotly_white'
+    )
+    return fig
+
+
+# 5. Radar Chart (Current Semester)
+def _radar(charts):
+    import plotly.graph_objects as go
+    df = charts.df
+    current_semester_df = df[df['semester'] == charts.current_semester]
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=current_semester_df['total'],
+        theta=current_semester_df['subject'],
+        fill='toself',
+        name='Current Semester'
+    ))
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )
+        ),
+        title='Current Semester Performance',
+        template='plotly_white'
+    )
+    return fig
+
+
+# 6. Box Plot
+def _box(charts):
+    import plotly.express as px
+    fig = px.box(
+        charts.df,
+        x='semester',
+        y='total',
+        title='Marks Distribution by Semester'
+    )
+    fig.update_layout(
+        xaxis_title='Semester',
+        yaxis_title='Total Marks',
+        template='plotly_white'
+    )
+    return fig
+
+
+# 7. Animated Scatter Plot (Performance Animation)
+def _scatter(charts):
+    import plotly.express as px
+    fig = px.scatter(
+        charts.df,
+        x='semester',
+        y='total',
+        animation_frame='semester',
+        animation_group='subject',
+        size='total',
+        color='subject',
+        title='Performance Across Semesters'
+    )
+    fig.update_layout(updatemenus=ANIMATION_MENU)
+    return fig
+
+
+# 8. Animated Bar Chart (Subject Performance)
+def _bar_animated(charts):
+    import plotly.express as px
+    fig = px.bar(
+        charts.df,
+        x='subject',
+        y='total',
+        animation_frame='semester',
+        title='Subject Performance Across Semesters'
+    )
+    fig.update_layout(updatemenus=ANIMATION_MENU)
+    return fig
+
+
+# 9. Progress Chart (Cumulative Performance)
+def _progress(charts):
+    import plotly.express as px
+    # Cumulative average for each subject across semesters
+    subject_progress = charts.df.groupby(['subject', 'semester'])['total'].mean().reset_index()
+    subject_progress = subject_progress.sort_values(['subject', 'semester'])
+    subject_progress['cumulative_avg'] = cumulative_average(subject_progress, 'subject', 'semester')
+
+    fig = px.line(
+        subject_progress,
+        x='semester',
+        y='cumulative_avg',
+        color='subject',
+        title='Subject Progress Over Time',
+        labels={'cumulative_avg': 'Cumulative Average', 'semester': 'Semester'}
+    )
+    fig.update_layout(
+        template='plotly_white',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        )
+    )
+    return fig
+
+
+# Figure name -> builder, in dashboard order
+FIGURES = {
+    'bar': _bar,
+    'line': _line,
+    'donut': _donut,
+    'heatmap': _heatmap,
+    'radar': _radar,
+    'box': _box,
+    'scatter': _scatter,
+    'bar_animated': _bar_animated,
+    'progress': _progress,
+}
@@ -0,0 +1,125 @@
+"""gzip/brotli response compression.
+
+init_compression(app) compresses HTML, JSON, CSS and JS responses of at
+least COMPRESS_MIN_SIZE bytes in the best encoding the client accepts
+(brotli when the optional ``brotli`` package is installed, else gzip).
+
+- Responses with an ETag are compressed once per (ETag, encoding), and the
+  compressed bodies are kept in precompressed_cache until the data version
+  moves.
+- Streamed responses (stream_template) are compressed chunk by chunk and
+  flushed, so the browser still gets the page progressively.
+- Static files, which Flask sends straight from disk (direct_passthrough),
+  are read into memory and compressed like any other body; their ETag
+  changes with the file, so the compressed copy is cached too.
+- Compressing turns a strong ETag weak (as nginx does). If-None-Match uses
+  weak comparison, so conditional requests keep matching.
+"""
+import gzip
+import zlib
+from flask import request
+from cache import LRUCache, register_cache
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Pending stream output is compressed and flushed once it reaches this size
+STREAM_FLUSH_BYTES = 16 * 1024
+
+# Compressed bodies keyed by (ETag, encoding)
+precompressed_cache = register_cache(LRUCache(maxsize=256, maxbytes=32 * 1024 * 1024, sizeof=len))
+
+
+def _encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    """Compress an iterable of str/bytes, flushing whenever enough is pending."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        # wbits=31: gzip container
+        compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_BYTES:
+                out += flush()
+                pending = 0
+            if out:
+                yield out
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response, config):
+    """Compress response in place when the client and content allow it."""
+    if response.mimetype not in config['COMPRESS_MIMETYPES']:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (
+        response.status_code != 200
+        or 'Content-Encoding' in response.headers
+        or request.method == 'HEAD'
+    ):
+        return response
+    encoding = _encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed and not response.direct_passthrough:
+        response.response = _compress_stream(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+    else:
+        # Reads (and closes) a passed-through static file
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        etag, weak = response.get_etag()
+        if etag:
+            compressed = precompressed_cache.get_or_create(
+                (etag, encoding), lambda: _compress(data, encoding, config)
+            )
+        else:
+            compressed = _compress(data, encoding, config)
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The bytes differ from the identity encoding's
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress app's responses according to its COMPRESS_* settings."""
+    precompressed_cache.resize(app.config['COMPRESS_CACHE_SIZE'], app.config['COMPRESS_CACHE_BYTES'])
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, app.config)
@@ -0,0 +1,81 @@
+"""Query helpers that feed the dashboards.
+
+Everything here selects plain columns with explicit joins so that building a
+DataFrame never instantiates ORM objects or triggers lazy relationship loads.
+"""
+from sqlalchemy import select, func, type_coerce
+from models import db, User, Student, Mark, Mentorship
+
+# Column order of the staff marks DataFrame
+STAFF_MARK_COLUMNS = [
+    'student_id', 'student_name', 'subject', 'internal',
+    'external', 'total', 'semester', 'department'
+]
+
+
+def staff_marks_query(semester=None):
+    """Build the single Mark ⨝ Student ⨝ User SELECT behind the staff views."""
+    stmt = (
+        select(
+            # Keep the key as stored; it is only used for grouping
+            type_coerce(Mark.student_id, db.String).label('student_id'),
+            User.name.label('student_name'),
+            Mark.subject,
+            Mark.internal,
+            Mark.external,
+            Mark.total,
+            Mark.semester,
+            Student.department
+        )
+        .join(Student, Mark.student_id == Student.id)
+        .join(User, Student.user_id == User.id)
+    )
+    if semester is not None:
+        stmt = stmt.where(Mark.semester == semester)
+    return stmt
+
+
+def load_staff_marks(semester=None):
+    """Return every mark (optionally for one semester) as a DataFrame.
+
+    Rows come back as plain tuples from one round-trip and go straight into
+    pandas, so cost grows with the number of marks, not with the number of
+    relationship hops per mark.
+    """
+    import pandas as pd
+    result = db.session.execute(staff_marks_query(semester))
+    df = pd.DataFrame.from_records(result.all(), columns=STAFF_MARK_COLUMNS)
+    df[['internal', 'external', 'total']] = df[['internal', 'external', 'total']].astype(float)
+    return df
+
+
+# Column order of a single student's marks
+STUDENT_MARK_COLUMNS = ['semester', 'subject', 'internal', 'external', 'total']
+
+
+def student_mark_rows(student_id, semester=None):
+    """One student's marks as plain tuples ordered by semester and subject."""
+    stmt = (
+        select(Mark.semester, Mark.subject, Mark.internal, Mark.external, Mark.total)
+        .where(Mark.student_id == student_id)
+        .order_by(Mark.semester, Mark.subject)
+    )
+    if semester is not None:
+        stmt = stmt.where(Mark.semester == semester)
+    return [tuple(row) for row in db.session.execute(stmt)]
+
+
+def count_students():
+    """Number of enrolled students without loading them."""
+    return db.session.scalar(select(func.count(Student.id)))
+
+
+def mentees_of(staff_id):
+    """Students mentored by one staff member, ordered by name."""
+    return db.session.execute(
+        select(Student.id, User.name, Student.reg_no, Student.department, Student.semester, Student.cgpa)
+        .join(Mentorship, Mentorship.student_id == Student.id)
+        .join(User, Student.user_id == User.id)
+        .where(Mentorship.staff_id == staff_id)
+        .order_by(User.name)
+    ).all()
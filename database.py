@@ -0,0 +1,89 @@
+"""Per-backend engine tuning applied by create_app.
+
+For file-backed SQLite this switches to WAL journaling, so dashboard reads no
+longer wait for populate_db or mark updates to commit, applies the
+SQLITE_PRAGMAS on every new connection and sizes the connection pool from
+SQLITE_POOL. In-memory databases and other backends are left alone.
+
+accumulating_insert builds the SQLite/PostgreSQL upsert that counters and
+running sums are written with; insert_missing the insert that skips rows
+whose key is already stored.
+"""
+from sqlalchemy import event, func
+from sqlalchemy.engine import make_url
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS with the SQLite pool defaults filled in."""
+    options = dict(config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if is_sqlite_file(config['SQLALCHEMY_DATABASE_URI']):
+        for key, value in config['SQLITE_POOL'].items():
+            options.setdefault(key, value)
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for each pragma on every new connection."""
+    if not pragmas:
+        return
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def configure_engine(app, db):
+    """Tune the engine db.init_app created for app, if it is file-backed SQLite."""
+    if is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+
+
+def _upsert(connection):
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    return upsert
+
+
+def insert_missing(connection, table, key_columns):
+    """INSERT that skips rows whose key is already stored (ON CONFLICT DO NOTHING).
+
+    ``key_columns`` must carry a unique constraint; add ``.returning()`` to
+    learn which rows went in. SQLite and PostgreSQL only.
+    """
+    return _upsert(connection)(table).on_conflict_do_nothing(index_elements=key_columns)
+
+
+def accumulating_insert(connection, table, key_columns, sums, extremes=None):
+    """INSERT of delta rows that adds into the existing row on a key conflict.
+
+    ``sums`` columns are added to the stored ones and the ``extremes``
+    (min column, max column) pair is widened, all in the one statement, so
+    concurrent writers to the same row add up instead of overwriting each
+    other. SQLite and PostgreSQL only.
+    """
+    if connection.dialect.name == 'postgresql':
+        lower, upper = func.least, func.greatest
+    else:
+        lower, upper = func.min, func.max
+    stmt = _upsert(connection)(table)
+    values = {name: table.c[name] + stmt.excluded[name] for name in sums}
+    if extremes:
+        # Delta rows of removed marks only carry no extremes (NULL)
+        for name, widen in zip(extremes, (lower, upper)):
+            stored, added = table.c[name], stmt.excluded[name]
+            values[name] = widen(func.coalesce(stored, added), func.coalesce(added, stored))
+    return stmt.on_conflict_do_update(index_elements=key_columns, set_=values)
@@ -0,0 +1,56 @@
+"""Conditional requests answered from the data version.
+
+Views decorated with conditional_on_data_version get an ETag built from
+cache.data_version(), the URL and the request body. A client that sends that
+tag back in If-None-Match gets a 304 before the view runs, so an unchanged
+page or refresh payload costs one read of the version table instead of the
+view's queries, figure builds and transfer.
+
+The data version lives in the database (see cache.py), so a tag issued by
+one worker is valid, or stale, in every other one as well: writes committed
+by any process, the import-marks command or populate_db move it.
+"""
+import functools
+import hashlib
+from flask import make_response, request, session
+from werkzeug.http import is_resource_modified
+from cache import data_version
+
+
+def data_version_etag(*models):
+    """ETag for the current request at the current version of ``models`` (default: all)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (str(data_version(*models)), request.full_path):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def conditional_on_data_version(*models):
+    """Decorate a view whose response only changes when ``models`` are written.
+
+    Successful responses carry the ETag and ``Cache-Control: private,
+    no-cache``, so browsers keep them but revalidate before every reuse.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are rendered into the page
+            if '_flashes' in session:
+                return view(*args, **kwargs)
+            # Taken before the view runs: a write committed meanwhile moves the
+            # version, so the next request can't match a tag for older data
+            etag = data_version_etag(*models)
+            if not is_resource_modified(request.environ, etag=etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,313 @@
+"""Bulk mark import from CSV or JSONL mark sheets.
+
+import_marks reads a whole sheet with pandas, validates it column by column
+and upserts the valid rows keyed by (student, semester, subject):
+
+- Students are named by ``reg_no`` (or ``student_id``, their UUID) and
+  resolved with one query per chunk of distinct keys.
+- Writes bypass the ORM unit of work. Each chunk of rows is one transaction
+  of executemany inserts (ON CONFLICT DO NOTHING on the mark's unique key)
+  and updates, and its old and new values are folded
+  into the rollups, student totals and CGPAs once per chunk
+  (aggregates.apply_*), not once per row.
+- Each chunk bumps the Mark data version in its own transaction (see
+  cache.py), so once it commits every process's result caches and ETags
+  move, whichever process ran the import. Student is left alone, as with
+  ORM mark writes: the CGPAs it holds are derived from the marks, so every
+  view showing them already depends on Mark, while the network page, which
+  only shows who students are, is not rebuilt.
+- Each chunk's new totals and changed CGPAs go to the change feed when it
+  commits, as ORM writes do. The feed lives in one process (see
+  change_feed.py): an import posted to /api/marks/bulk reaches the live
+  streams of the worker that served it, while `flask import-marks` reaches
+  none of the web workers' streams.
+
+Invalid rows are skipped and reported; a failing chunk is rolled back, while
+chunks committed before it stay imported. The report returned has row counts,
+the first errors, per-phase timings and the throughput.
+"""
+import time
+import uuid
+from sqlalchemy import select, update, bindparam
+from models import db, Student, Mark
+from aggregates import apply_contributions, apply_student_contributions, cgpa_feed_changes
+from cache import bump_data_version
+from database import insert_missing
+import change_feed
+
+# Columns every sheet needs besides one of STUDENT_KEYS; total is optional
+# and must equal internal + external when given
+SHEET_COLUMNS = ['semester', 'subject', 'internal', 'external']
+STUDENT_KEYS = ['reg_no', 'student_id']
+SEMESTERS = range(1, 9)
+MAX_TOTAL = 100
+
+# Format name, file extension or MIME type -> sheet format
+FORMATS = {
+    'csv': 'csv', '.csv': 'csv', 'text/csv': 'csv',
+    'jsonl': 'jsonl', '.jsonl': 'jsonl', '.ndjson': 'jsonl',
+    'application/jsonl': 'jsonl', 'application/x-ndjson': 'jsonl', 'application/x-jsonlines': 'jsonl',
+}
+
+# Errors listed in a report; all of them are counted
+MAX_REPORTED_ERRORS = 50
+
+# Distinct student keys per lookup query
+_LOOKUP_CHUNK = 1000
+
+# Column order of validated marks
+_MARK_COLUMNS = ['student_id', 'department', 'semester', 'subject', 'internal', 'external', 'total']
+
+
+def sheet_format(*hints):
+    """'csv' or 'jsonl' from the first recognised format name, file name or MIME type."""
+    for hint in hints:
+        if not hint:
+            continue
+        hint = hint.lower()
+        if hint in FORMATS:
+            return FORMATS[hint]
+        extension = hint[hint.rfind('.'):] if '.' in hint else None
+        if extension in FORMATS:
+            return FORMATS[extension]
+    raise ValueError('Unknown mark sheet format; send CSV or JSONL')
+
+
+def read_mark_sheet(source, fmt):
+    """The sheet at ``source`` (a path or file object) as a DataFrame of raw values."""
+    import pandas as pd
+    if fmt == 'csv':
+        return pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+    return pd.read_json(source, lines=True, dtype=False, convert_dates=False)
+
+
+def _text(column):
+    """Column as stripped strings, with missing values as ''."""
+    return column.where(column.notna(), '').astype(str).str.strip()
+
+
+def _resolve_students(key, values):
+    """{sheet key: (Student.id, department)} for the keys that name a student."""
+    if key == 'student_id':
+        parsed = {}
+        for value in values:
+            try:
+                parsed[value] = uuid.UUID(value)
+            except ValueError:
+                pass
+        column, lookup = Student.id, parsed
+    else:
+        column, lookup = Student.reg_no, {value: value for value in values}
+
+    stored = {}
+    wanted = list(set(lookup.values()))
+    for offset in range(0, len(wanted), _LOOKUP_CHUNK):
+        rows = db.session.execute(
+            select(column, Student.id, Student.department).where(column.in_(wanted[offset:offset + _LOOKUP_CHUNK]))
+        )
+        stored.update((row[0], (row[1], row[2] or '')) for row in rows)
+    return {value: stored[lookup[value]] for value in values if lookup.get(value) in stored}
+
+
+def validate_marks(sheet):
+    """Split a raw sheet into valid marks and row errors.
+
+    Returns (DataFrame of _MARK_COLUMNS, first MAX_REPORTED_ERRORS
+    {'row', 'error'} dicts, number of invalid rows). Rows are numbered from 1
+    in sheet order. Raises ValueError if required columns are missing.
+    """
+    import pandas as pd
+    sheet = sheet.rename(columns=lambda name: str(name).strip().lower()).reset_index(drop=True)
+    key_columns = [name for name in STUDENT_KEYS if name in sheet.columns]
+    missing = [name for name in SHEET_COLUMNS if name not in sheet.columns]
+    if not key_columns or missing:
+        raise ValueError(
+            f"Mark sheet needs a {' or '.join(STUDENT_KEYS)} column and {', '.join(SHEET_COLUMNS)}"
+            + (f"; missing {', '.join(missing)}" if missing else '')
+        )
+
+    # First problem found in each row ('' for valid rows)
+    problems = pd.Series('', index=sheet.index)
+
+    def flag(mask, message):
+        problems[mask & (problems == '')] = message
+
+    numbers = {}
+    for name in ('semester', 'internal', 'external', 'total'):
+        if name not in sheet.columns:
+            continue
+        number = pd.to_numeric(sheet[name], errors='coerce')
+        invalid = number.isna() | (number % 1 != 0)
+        if name == 'total':
+            # A blank total is computed
+            invalid &= _text(sheet[name]) != ''
+        flag(invalid, f'{name} must be a whole number')
+        numbers[name] = number
+
+    computed = numbers['internal'] + numbers['external']
+    total = numbers['total'].fillna(computed) if 'total' in numbers else computed
+    flag(~numbers['semester'].isin(SEMESTERS), f'semester must be {SEMESTERS[0]}-{SEMESTERS[-1]}')
+    flag((numbers['internal'] < 0) | (numbers['external'] < 0), 'marks cannot be negative')
+    flag(total != computed, 'total must equal internal + external')
+    flag(total > MAX_TOTAL, f'total cannot exceed {MAX_TOTAL}')
+
+    subject = _text(sheet['subject'])
+    flag(subject == '', 'subject is required')
+
+    # Each row names its student by the first of STUDENT_KEYS it fills in
+    named = pd.Series(False, index=sheet.index)
+    student_ids = pd.Series(None, index=sheet.index, dtype=object)
+    departments = pd.Series(None, index=sheet.index, dtype=object)
+    for key in key_columns:
+        keys = _text(sheet[key]).where(~named, '')
+        given = keys != ''
+        students = _resolve_students(key, keys[given].unique().tolist())
+        student_ids = student_ids.where(~given, keys.map({value: student[0] for value, student in students.items()}))
+        departments = departments.where(~given, keys.map({value: student[1] for value, student in students.items()}))
+        named |= given
+    flag(~named, f"{' or '.join(STUDENT_KEYS)} is required")
+    flag(student_ids.isna(), 'unknown student')
+
+    marks = pd.DataFrame({
+        'student_id': student_ids,
+        'department': departments,
+        'semester': numbers['semester'],
+        'subject': subject,
+        'internal': numbers['internal'],
+        'external': numbers['external'],
+        'total': total,
+    })
+    valid = problems == ''
+    duplicate = marks[valid].duplicated(['student_id', 'semester', 'subject'], keep=False)
+    flag(duplicate.reindex(sheet.index, fill_value=False), 'same student, semester and subject as another row')
+
+    valid = problems == ''
+    marks = marks[valid].astype({'semester': int, 'internal': int, 'external': int, 'total': int})
+    invalid = problems[~valid]
+    errors = [
+        {'row': int(index) + 1, 'error': message}
+        for index, message in invalid.head(MAX_REPORTED_ERRORS).items()
+    ]
+    return marks, errors, len(invalid)
+
+
+def _stored_marks(connection, student_ids):
+    """{(student_id, semester, subject): stored row} for the students' marks."""
+    table = Mark.__table__
+    rows = connection.execute(
+        select(table.c.id, table.c.student_id, table.c.semester, table.c.subject,
+               table.c.internal, table.c.external, table.c.total)
+        .where(table.c.student_id.in_(set(student_ids)))
+    )
+    return {(row.student_id, row.semester, row.subject): row for row in rows}
+
+
+def _write_chunk(session, marks):
+    """Upsert one chunk of validated marks and fold the changes into the aggregates.
+
+    New keys are inserted with ON CONFLICT DO NOTHING on
+    uq_mark_student_semester_subject, so a mark another writer stored in the
+    meantime is never duplicated: it is read back and updated like any
+    existing one. The changes are queued for the change feed. Returns
+    (inserted, updated, unchanged) sheet rows.
+    """
+    connection = session.connection()
+    table = Mark.__table__
+    rows = list(zip(*(marks[name].tolist() for name in _MARK_COLUMNS)))
+    stored = _stored_marks(connection, marks['student_id'])
+
+    inserts = {
+        (student_id, semester, subject): {
+            'id': uuid.uuid4(), 'student_id': student_id, 'semester': semester, 'subject': subject,
+            'internal': internal, 'external': external, 'total': total
+        }
+        for student_id, _, semester, subject, internal, external, total in rows
+        if (student_id, semester, subject) not in stored
+    }
+    inserted = set()
+    if inserts:
+        inserted = set(connection.execute(
+            insert_missing(connection, table, ['student_id', 'semester', 'subject']).returning(table.c.id),
+            list(inserts.values())
+        ).scalars())
+        raced = {key[0] for key, mark in inserts.items() if mark['id'] not in inserted}
+        if raced:
+            stored.update(_stored_marks(connection, raced))
+
+    # added/removed: (student_id, department, subject, semester, internal, external, total)
+    updates, added, removed, feed, departments = [], [], [], [], {}
+    updated = unchanged = 0
+    for student_id, department, semester, subject, internal, external, total in rows:
+        departments[student_id] = department
+        mark = (student_id, department, subject, semester, internal, external, total)
+        key = (student_id, semester, subject)
+        if key in inserts and inserts[key]['id'] in inserted:
+            added.append(mark)
+            feed.append(('mark', subject, total))
+            continue
+        row = stored[key]
+        if (row.internal, row.external, row.total) == (internal, external, total):
+            unchanged += 1
+            continue
+        updated += 1
+        updates.append({'mark_id': row.id, 'internal': internal, 'external': external, 'total': total})
+        removed.append((student_id, department, subject, semester, row.internal, row.external, row.total))
+        added.append(mark)
+        if row.total != total:
+            feed.append(('mark', subject, total))
+
+    if updates:
+        connection.execute(update(table).where(table.c.id == bindparam('mark_id')), updates)
+    changed = apply_student_contributions(
+        connection,
+        [(row[0], row[3], row[6]) for row in added],
+        [(row[0], row[3], row[6]) for row in removed],
+        departments
+    )
+    apply_contributions(connection, [row[1:] for row in added], [row[1:] for row in removed])
+    # Published like ORM writes: new marks and changed totals, then changed CGPAs
+    change_feed.record(session, feed + cgpa_feed_changes(changed))
+    return len(inserted), updated, unchanged
+
+
+def import_marks(source, fmt, chunk_size=5000):
+    """Import the mark sheet at ``source`` (a path or file object) in ``fmt``.
+
+    Raises ValueError for unreadable sheets or missing columns.
+    """
+    start = time.perf_counter()
+    sheet = read_mark_sheet(source, fmt)
+    parsed = time.perf_counter()
+    marks, errors, invalid = validate_marks(sheet)
+    validated = time.perf_counter()
+
+    written = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    chunks = 0
+    for offset in range(0, len(marks), chunk_size):
+        try:
+            counts = _write_chunk(db.session, marks.iloc[offset:offset + chunk_size])
+            bump_data_version(db.session.connection(), Mark)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for name, count in zip(written, counts):
+            written[name] += count
+        chunks += 1
+    done = time.perf_counter()
+
+    return {
+        'rows': len(sheet),
+        'imported': len(marks),
+        'invalid': invalid,
+        'errors': errors,
+        **written,
+        'chunks': chunks,
+        'seconds': {
+            'parse': round(parsed - start, 3),
+            'validate': round(validated - parsed, 3),
+            'write': round(done - validated, 3),
+            'total': round(done - start, 3),
+        },
+        'rows_per_second': round(len(sheet) / (done - start)) if done > start else None,
+    }
@@ -0,0 +1,144 @@
+"""Upgrade an existing SQLite academic.db to the current schema.
+
+- Rebuilds user, student, mark and mentorship with 16-byte BLOB keys when they
+  still hold UUIDs as text (the old UUID/CHAR(32) columns)
+- Creates any missing tables and indexes
+- Adds the unique (student, semester, subject) key to mark, keeping the first
+  stored mark of each key and dropping (and reporting) the others
+- Rebuilds the mark rollups
+
+Rows whose keys were already mangled by SQLite's numeric coercion of the old
+UUID columns cannot be recovered and are dropped (and reported).
+
+    python migrate_db.py [path/to/academic.db]
+"""
+import os
+import sys
+import uuid
+from sqlalchemy import create_engine, inspect, text
+from models import db
+from aggregates import rebuild_aggregates
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'academic.db')
+
+# Tables with UUID key columns, in dependency order
+KEYED_TABLES = {
+    'user': ('id',),
+    'student': ('id', 'user_id'),
+    'mark': ('id', 'student_id'),
+    'mentorship': ('staff_id', 'student_id'),
+}
+
+# Unique key of the mark table (uq_mark_student_semester_subject)
+MARK_KEY = ('student_id', 'semester', 'subject')
+
+
+def guid_bytes(value):
+    """Convert a legacy key to its 16-byte form, or None if it is unusable."""
+    if isinstance(value, bytes) and len(value) == 16:
+        return value
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value).bytes
+        except ValueError:
+            return None
+    return None
+
+
+def _needs_rebuild(inspector, table):
+    columns = {column['name']: column for column in inspector.get_columns(table)}
+    key = KEYED_TABLES[table][0]
+    return key in columns and str(columns[key]['type']).upper() != 'BLOB'
+
+
+def drop_duplicate_marks(conn, table='mark', student_key='student_id'):
+    """Delete all but the first stored mark of each MARK_KEY; returns how many went.
+
+    ``student_key`` is the SQL the student column is compared by, e.g.
+    guid_bytes(student_id) for legacy tables still holding text keys.
+    """
+    # NULL semesters/subjects never collide
+    return conn.exec_driver_sql(
+        f'DELETE FROM "{table}" WHERE semester IS NOT NULL AND subject IS NOT NULL AND rowid NOT IN '
+        f'(SELECT min(rowid) FROM "{table}" GROUP BY {student_key}, semester, subject)'
+    ).rowcount
+
+
+def ensure_mark_key(conn):
+    """Add the unique MARK_KEY index to a mark table created without it.
+
+    Returns None if the key was already there, otherwise the number of
+    duplicate marks dropped to add it (the rollups need rebuilding then).
+    SQLite only; other databases raise RuntimeError when the key is missing.
+    """
+    inspector = inspect(conn)
+    columns = list(MARK_KEY)
+    if any(constraint['column_names'] == columns for constraint in inspector.get_unique_constraints('mark')) \
+            or any(index['unique'] and index['column_names'] == columns for index in inspector.get_indexes('mark')):
+        return None
+    if conn.dialect.name != 'sqlite':
+        raise RuntimeError(
+            f'The mark table has no unique ({", ".join(MARK_KEY)}) key, which mark imports need; '
+            f'add uq_mark_student_semester_subject to it'
+        )
+    dropped = drop_duplicate_marks(conn)
+    conn.exec_driver_sql(
+        f'CREATE UNIQUE INDEX uq_mark_student_semester_subject ON mark ({", ".join(MARK_KEY)})'
+    )
+    return dropped
+
+
+def migrate(path):
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        # Renaming must not rewrite foreign keys of the tables left in place
+        conn.exec_driver_sql('PRAGMA legacy_alter_table=ON')
+        conn.connection.driver_connection.create_function('guid_bytes', 1, guid_bytes, deterministic=True)
+
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        rebuilt = [table for table in KEYED_TABLES if table in existing and _needs_rebuild(inspector, table)]
+        for table in rebuilt:
+            conn.exec_driver_sql(f'ALTER TABLE "{table}" RENAME TO "_legacy_{table}"')
+        if 'mark' in rebuilt:
+            # The new mark table is created with the unique key
+            dropped = drop_duplicate_marks(conn, '_legacy_mark', 'guid_bytes(student_id)')
+            if dropped:
+                print(f'mark: dropped {dropped} duplicate marks')
+
+        # New tables come with their indexes; older tables get missing ones added
+        db.metadata.create_all(conn)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        for table in rebuilt:
+            columns = [column.name for column in db.metadata.tables[table].columns]
+            legacy = {column['name'] for column in inspect(conn).get_columns(f'_legacy_{table}')}
+            columns = [name for name in columns if name in legacy]
+            keys = KEYED_TABLES[table]
+            select_list = ', '.join(
+                f'guid_bytes("{name}")' if name in keys else f'"{name}"' for name in columns
+            )
+            valid = ' AND '.join(f'guid_bytes("{name}") IS NOT NULL' for name in keys)
+            column_list = ', '.join(f'"{name}"' for name in columns)
+            copied = conn.exec_driver_sql(
+                f'INSERT INTO "{table}" ({column_list}) SELECT {select_list} FROM "_legacy_{table}" WHERE {valid}'
+            ).rowcount
+            total = conn.scalar(text(f'SELECT count(*) FROM "_legacy_{table}"'))
+            conn.exec_driver_sql(f'DROP TABLE "_legacy_{table}"')
+            print(f'{table}: converted {copied} rows' + (f', dropped {total - copied} with unreadable keys' if total != copied else ''))
+
+        dropped = ensure_mark_key(conn)
+        if dropped is not None:
+            print('mark: added the unique student/semester/subject key' + (f', dropped {dropped} duplicate marks' if dropped else ''))
+        rebuild_aggregates(conn)
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql('VACUUM')
+    print(f'{path} is up to date')
+
+
+if __name__ == '__main__':
+    migrate(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
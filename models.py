@@ -1,35 +1,138 @@
 import uuid
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator, LargeBinary, Uuid
 
 db = SQLAlchemy()
 
+class GUID(TypeDecorator):
+    """UUID stored natively where the database has a UUID type and as 16 raw
+    bytes elsewhere, which keeps SQLite keys and indexes at half the size of
+    hex text and compared with memcmp."""
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(Uuid(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value if dialect.name == 'postgresql' else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        if isinstance(value, bytes):
+            return uuid.UUID(bytes=value)
+        return uuid.UUID(str(value))
+
 class User(db.Model):
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
     name = db.Column(db.String, nullable=False)
     role = db.Column(db.String, nullable=False)  # "student" or "staff"
     student = relationship("Student", back_populates="user", uselist=False)
 
+    __table_args__ = (
+        # Login looks users up by role and name; staff listings by role
+        db.Index('ix_user_role_name', 'role', 'name'),
+    )
+
 class Student(db.Model):
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(GUID, db.ForeignKey('user.id'), nullable=False, index=True)
     reg_no = db.Column(db.String, unique=True)
-    department = db.Column(db.String)
+    department = db.Column(db.String, index=True)
     semester = db.Column(db.Integer)
-    cgpa = db.Column(db.Numeric(3,2))
+    cgpa = db.Column(db.Numeric(3,2), default=0)  # maintained by aggregates from the student's marks
     attendance = db.Column(db.Numeric(5,2))
     
     user = relationship("User", back_populates="student")
     marks = relationship("Mark", back_populates="student")
+    mentorships = relationship("Mentorship", back_populates="student")
 
 class Mark(db.Model):
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    student_id = db.Column(UUID(as_uuid=True), db.ForeignKey('student.id'), nullable=False)
+    id = db.Column(GUID, primary_key=True, default=uuid.uuid4)
+    student_id = db.Column(GUID, db.ForeignKey('student.id'), nullable=False)
     semester = db.Column(db.Integer)
     subject = db.Column(db.String)
     internal = db.Column(db.Integer)
     external = db.Column(db.Integer)
     total = db.Column(db.Integer)
     
-    student = relationship("Student", back_populates="marks") 
\ No newline at end of file
+    student = relationship("Student", back_populates="marks")
+
+    __table_args__ = (
+        # One mark per student, semester and subject; mark_import upserts on it
+        db.UniqueConstraint('student_id', 'semester', 'subject', name='uq_mark_student_semester_subject'),
+        # Per-student mark lookups, optionally narrowed to a semester
+        db.Index('ix_mark_student_semester', 'student_id', 'semester'),
+        # Staff views filtered by semester
+        db.Index('ix_mark_semester_subject', 'semester', 'subject'),
+    )
+
+class Mentorship(db.Model):
+    """A staff member mentoring a student.
+
+    The primary key serves lookups by staff; students have their own index.
+    """
+    staff_id = db.Column(GUID, db.ForeignKey('user.id'), primary_key=True)
+    student_id = db.Column(GUID, db.ForeignKey('student.id'), primary_key=True, index=True)
+
+    staff = relationship("User")
+    student = relationship("Student", back_populates="mentorships")
+
+class MarkAggregate(db.Model):
+    """Running totals of Mark.total for one rollup group.
+
+    Columns that are not part of a grain hold '' (strings) or 0 (semester) so
+    that the unique constraint also holds for partial keys.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    grain = db.Column(db.String, nullable=False)  # key of aggregates.GRAINS
+    department = db.Column(db.String, nullable=False, default='')
+    subject = db.Column(db.String, nullable=False, default='')
+    semester = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_total = db.Column(db.BigInteger, nullable=False, default=0)
+    sumsq_total = db.Column(db.BigInteger, nullable=False, default=0)
+    min_total = db.Column(db.Integer)
+    max_total = db.Column(db.Integer)
+    sum_internal = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_external = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('grain', 'department', 'subject', 'semester'),
+    )
+
+class StudentTotal(db.Model):
+    """Running sum and count of one student's Mark.total.
+
+    One row per student and semester plus an overall row with semester 0.
+    mean_total (rounded to 2 places) and department are kept on the row so
+    top-N lists, optionally per department, are an ordered index scan.
+    """
+    student_id = db.Column(GUID, db.ForeignKey('student.id'), primary_key=True)
+    semester = db.Column(db.Integer, primary_key=True)
+    department = db.Column(db.String, nullable=False, default='')
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_total = db.Column(db.BigInteger, nullable=False, default=0)
+    mean_total = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_student_total_rank', 'semester', db.text('mean_total DESC'), 'student_id'),
+        db.Index('ix_student_total_department_rank', 'semester', 'department', db.text('mean_total DESC'), 'student_id'),
+    )
+
+class DataVersion(db.Model):
+    """Write counter of one tracked model, named after its class.
+
+    Bumped in the transaction that writes the model, so every process sees
+    the new version as soon as the write commits.
+    """
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
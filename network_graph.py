@@ -0,0 +1,146 @@
+"""Student-staff network artifact.
+
+The pyvis page is rebuilt only when User/Student/Mentorship data changes.
+Each build is written atomically under a content-addressed name in static/,
+so concurrent requests never see a half-written file and browsers can cache
+it forever.
+"""
+import os
+import glob
+import hashlib
+import tempfile
+import threading
+from sqlalchemy import select
+from models import db, User, Student, Mentorship
+from cache import data_version
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Number of old artifacts kept around for pages that still reference them
+KEEP_ARTIFACTS = 5
+
+NETWORK_OPTIONS = """
+{
+  "physics": {
+    "barnesHut": {
+      "gravitationalConstant": -80000,
+      "springConstant": 0.001,
+      "springLength": 200
+    },
+    "stabilization": {
+      "enabled": true,
+      "iterations": 1000
+    }
+  },
+  "interaction": {
+    "navigationButtons": true,
+    "keyboard": true
+  }
+}
+"""
+
+_lock = threading.Lock()
+_built = {'version': None, 'filename': None}
+
+
+def build_network_html():
+    """Render the student-staff network as a standalone HTML page."""
+    from pyvis.network import Network
+    net = Network(height="500px", width="100%", notebook=False, directed=False)
+
+    students = db.session.execute(
+        select(Student.id, User.name, Student.reg_no, Student.department)
+        .join(User, Student.user_id == User.id)
+        .order_by(Student.id)
+    ).all()
+    staff = db.session.execute(
+        select(User.id, User.name).where(User.role == 'staff').order_by(User.id)
+    ).all()
+
+    # Add student nodes
+    for student in students:
+        net.add_node(
+            str(student.id),
+            label=student.name,
+            title=f"Student: {student.name}<br>Reg No: {student.reg_no}<br>Department: {student.department}",
+            color="#97c2fc",
+            shape="dot",
+            size=15
+        )
+
+    # Add staff nodes
+    for staff_member in staff:
+        net.add_node(
+            str(staff_member.id),
+            label=staff_member.name,
+            title=f"Staff: {staff_member.name}<br>Department: Not specified",
+            color="#ff9999",
+            shape="star",
+            size=25
+        )
+
+    # Add mentorship edges
+    mentorships = db.session.execute(
+        select(Mentorship.student_id, Mentorship.staff_id)
+        .order_by(Mentorship.student_id, Mentorship.staff_id)
+    ).all()
+    for student_id, staff_id in mentorships:
+        net.add_edge(
+            str(student_id),
+            str(staff_id),
+            title="Mentor",
+            color="#CCCCCC",
+            width=2
+        )
+
+    # Enable physics for animation
+    net.set_options(NETWORK_OPTIONS)
+    return net.generate_html()
+
+
+def write_artifact(html):
+    """Write html to static/ under its content hash and return the filename."""
+    digest = hashlib.sha256(html.encode('utf-8')).hexdigest()[:16]
+    filename = f'network-{digest}.html'
+    path = os.path.join(STATIC_DIR, filename)
+    if os.path.exists(path):
+        return filename
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=STATIC_DIR, prefix='.network-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            out.write(html)
+        # mkstemp creates the file 0600; static files must be readable by the web server
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _prune_artifacts()
+    return filename
+
+
+def _prune_artifacts():
+    artifacts = sorted(glob.glob(os.path.join(STATIC_DIR, 'network-*.html')), key=os.path.getmtime)
+    for path in artifacts[:-KEEP_ARTIFACTS]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def network_artifact():
+    """Filename (relative to static/) of the network page for the current data.
+
+    Only the first call after a User/Student/Mentorship write does any graph
+    work.
+    """
+    version = data_version(User, Student, Mentorship)
+    if _built['version'] == version:
+        return _built['filename']
+    with _lock:
+        if _built['version'] != version:
+            _built['filename'] = write_artifact(build_network_html())
+            _built['version'] = version
+    return _built['filename']
@@ -1,7 +1,13 @@
+import argparse
 import random
+import time
+import numpy as np
 from faker import Faker
-from models import db, User, Student, Mark
-from app import create_app
+from sqlalchemy import insert
+from models import db, User, Student, Mark, MarkAggregate, Mentorship, StudentTotal
+from aggregates import rebuild_aggregates
+from cache import bump_data_version
+from app import create_app, init_db
 import uuid
 
 fake = Faker('en_IN')  # Indian locale for names
@@ -25,24 +31,36 @@ def generate_marks():
     external = random.randint(40, 50)
     return internal, external, internal + external
 
-def calculate_gpa(marks):
-    if not marks:
-        return 0.0
-    total = sum(mark.total for mark in marks)
-    max_possible = len(marks) * 100
-    gpa = (total / max_possible) * 10
-    return min(round(gpa, 2), 9.99)
+def assign_mentors(student_ids, staff_ids):
+    """Bulk-insert 1-2 random staff mentors for each student."""
+    rows = []
+    for student_id in student_ids:
+        num_mentors = random.randint(1, 2)
+        for staff_id in random.sample(staff_ids, min(num_mentors, len(staff_ids))):
+            rows.append({'staff_id': staff_id, 'student_id': student_id})
+    if rows:
+        db.session.execute(insert(Mentorship), rows)
+
+def clear_db():
+    MarkAggregate.query.delete()
+    StudentTotal.query.delete()
+    Mentorship.query.delete()
+    Mark.query.delete()
+    Student.query.delete()
+    User.query.delete()
+    # Bulk deletes bypass the unit of work the version is tracked by
+    bump_data_version(db.session.connection())
+    db.session.commit()
 
 def populate_db(num_students=20):
     app = create_app()
     with app.app_context():
+        init_db()
         # Clear existing data
-        Mark.query.delete()
-        Student.query.delete()
-        User.query.delete()
-        db.session.commit()
+        clear_db()
 
         # Generate students
+        student_ids = []
         for _ in range(num_students):
             # Create user
             user = User(
@@ -64,11 +82,11 @@ def populate_db(num_students=20):
             )
             db.session.add(student)
             db.session.flush()
+            student_ids.append(student.id)
 
-            # Generate marks for each semester
-            all_semester_marks = []
+            # Generate marks for each semester; the CGPA is kept up to date
+            # from them by aggregates
             for sem in range(1, 9):
-                semester_marks = []
                 for subject in SUBJECTS[sem]:
                     # 15% chance of missing mark entry
                     if random.random() > 0.15:
@@ -83,13 +101,9 @@ def populate_db(num_students=20):
                             total=total
                         )
                         db.session.add(mark)
-                        semester_marks.append(mark)
-                all_semester_marks.extend(semester_marks)
-                
-                # Calculate and update CGPA
-                student.cgpa = calculate_gpa(all_semester_marks)
             
         # Create staff users
+        staff_ids = []
         for _ in range(5):
             staff = User(
                 id=uuid.uuid4(),
@@ -97,13 +111,122 @@ def populate_db(num_students=20):
                 role='staff'
             )
             db.session.add(staff)
+            staff_ids.append(staff.id)
+        db.session.flush()
+
+        # Assign mentors
+        assign_mentors(student_ids, staff_ids)
+
+        db.session.commit()
+
+def generate_mark_batch(rng, student_ids):
+    """Vectorized marks for a batch of students, with the same distribution as generate_marks.
+
+    Returns the Mark rows.
+    """
+    subjects = [(sem, subject) for sem in range(1, 9) for subject in SUBJECTS[sem]]
+    # 15% chance of missing mark entry
+    present = rng.random((len(student_ids), len(subjects))) > 0.15
+    rows, cols = np.nonzero(present)
+    internal = rng.integers(40, 51, size=len(rows))
+    external = rng.integers(40, 51, size=len(rows))
+    total = internal + external
+
+    marks = [
+        {
+            'id': uuid.uuid4(),
+            'student_id': student_ids[row],
+            'semester': subjects[col][0],
+            'subject': subjects[col][1],
+            'internal': i,
+            'external': e,
+            'total': t
+        }
+        for row, col, i, e, t in zip(rows.tolist(), cols.tolist(), internal.tolist(), external.tolist(), total.tolist())
+    ]
+    return marks
+
+def populate_db_bulk(num_students, chunk_size=10000, num_staff=5, seed=None):
+    """Seed a large database with executemany inserts in chunks.
 
+    Skips the ORM unit of work entirely, so the mark rollups and CGPAs are
+    rebuilt once at the end instead of being maintained row by row.
+    """
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    Faker.seed(seed)
+    app = create_app()
+    with app.app_context():
+        init_db()
+        clear_db()
+        start = time.perf_counter()
+        written = 0
+
+        student_ids = []
+        for offset in range(0, num_students, chunk_size):
+            size = min(chunk_size, num_students - offset)
+            user_ids = [uuid.uuid4() for _ in range(size)]
+            batch_ids = [uuid.uuid4() for _ in range(size)]
+            marks = generate_mark_batch(rng, batch_ids)
+            departments = rng.integers(0, len(DEPARTMENTS), size=size).tolist()
+            semesters = rng.integers(1, 9, size=size).tolist()
+            attendance = np.round(rng.uniform(75, 100, size=size), 2).tolist()
+
+            db.session.connection().execute(User.__table__.insert(), [
+                {'id': user_id, 'name': fake.name(), 'role': 'student'} for user_id in user_ids
+            ])
+            db.session.connection().execute(Student.__table__.insert(), [
+                {
+                    'id': batch_ids[i],
+                    'user_id': user_ids[i],
+                    # Sequential registration numbers stay unique at any scale
+                    'reg_no': f'2024{offset + i:07d}',
+                    'department': DEPARTMENTS[departments[i]],
+                    'semester': semesters[i],
+                    'attendance': attendance[i]
+                }
+                for i in range(size)
+            ])
+            for mark_offset in range(0, len(marks), chunk_size):
+                db.session.connection().execute(Mark.__table__.insert(), marks[mark_offset:mark_offset + chunk_size])
+            db.session.commit()
+
+            student_ids.extend(batch_ids)
+            written += 2 * size + len(marks)
+            elapsed = time.perf_counter() - start
+            print(f'{offset + size}/{num_students} students, {written} rows, {written / elapsed:,.0f} rows/s')
+
+        staff_ids = [uuid.uuid4() for _ in range(num_staff)]
+        db.session.connection().execute(User.__table__.insert(), [
+            {'id': staff_id, 'name': f"Prof. {fake.name()}", 'role': 'staff'} for staff_id in staff_ids
+        ])
+        assign_mentors(student_ids, staff_ids)
+        rebuild_aggregates(db.session.connection())
+        bump_data_version(db.session.connection())
         db.session.commit()
 
+        elapsed = time.perf_counter() - start
+        print(f'Done: {written} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)')
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {number}')
+    return number
+
 if __name__ == '__main__':
-    num = input("How many students to generate? [default=20]: ")
-    try:
-        num = int(num)
-    except (ValueError, TypeError):
-        num = 20
-    populate_db(num) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Seed the academic database with sample data.')
+    parser.add_argument('num_students', nargs='?', type=int, default=20,
+                        help='number of students to generate (default: 20)')
+    parser.add_argument('--bulk', action='store_true',
+                        help='use chunked executemany inserts for large databases')
+    parser.add_argument('--chunk-size', type=positive_int, default=10000,
+                        help='rows per insert batch in bulk mode (default: 10000)')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible data')
+    args = parser.parse_args()
+
+    if args.bulk:
+        populate_db_bulk(args.num_students, chunk_size=args.chunk_size, seed=args.seed)
+    else:
+        populate_db(args.num_students) 
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Aggregated series behind the staff dashboard and its refresh charts.
+
+load_staff_series() returns the same frames on every backend. The top-N
+students always come from the maintained StudentTotal index
+(aggregates.top_students). On SQLite the other series are computed in pandas
+from the joined marks (data_access.load_staff_marks). On PostgreSQL the
+grouping, the running averages (window functions) and the subject quartiles
+(percentile_cont) run in the database, so only aggregated rows cross the wire.
+
+Subject distributions are summarized rather than sent mark by mark: quartiles
+with Tukey whiskers (the furthest marks within 1.5 IQR of the box) and an
+evenly spaced sample of the outliers, stratified by subject: at most
+``box_points`` in all, but at least one per subject that has outliers.
+Payloads stay the same size however many marks there are.
+"""
+import math
+from sqlalchemy import select, func, type_coerce, literal
+from models import db, User, Student, Mark
+from data_access import load_staff_marks
+from aggregates import top_students, top_students_query
+from analytics import cumulative_average
+
+# Series columns shared by both backends
+TOP_COLUMNS = ['student_id', 'student_name', 'total', 'semesters']
+STUDENT_SEMESTER_COLUMNS = ['student_id', 'student_name', 'semester', 'total']
+PROGRESS_COLUMNS = STUDENT_SEMESTER_COLUMNS + ['cumulative_avg']
+SUBJECT_SEMESTER_COLUMNS = ['subject', 'semester', 'total']
+SUBJECT_BOX_COLUMNS = ['subject', 'count', 'lowerfence', 'q1', 'median', 'q3', 'upperfence', 'mean']
+SUBJECT_OUTLIER_COLUMNS = ['subject', 'total']
+
+# Default cap on the outlier points sent for the subject box plot
+BOX_POINTS = 500
+
+
+def server_side_aggregation():
+    """Whether the bound database computes the staff series itself."""
+    return db.engine.dialect.name == 'postgresql'
+
+
+def load_staff_series(semester=None, top_n=10, all_students=True, box_points=BOX_POINTS):
+    """Staff series for one semester (or all when None).
+
+    Returns a dict with
+    - mean_total: mean of all mark totals (None without marks)
+    - top_students: the top_n students by mean total (TOP_COLUMNS)
+    - student_semester: per-student semester means, for every student or,
+      with all_students=False, only the top_n (STUDENT_SEMESTER_COLUMNS)
+    - progress: running mean of the top_n students' semester means (PROGRESS_COLUMNS)
+    - subject_semester: mean total per subject and semester (SUBJECT_SEMESTER_COLUMNS)
+    - subject_box: per-subject count, quartiles, whiskers and mean (SUBJECT_BOX_COLUMNS)
+    - subject_outliers: up to box_points marks outside the whiskers (SUBJECT_OUTLIER_COLUMNS)
+    """
+    top = top_students(top_n, semester)
+    if server_side_aggregation():
+        return _series_from_sql(semester, top, top_students_query(top_n, semester), all_students, box_points)
+    return _series_from_frame(load_staff_marks(semester), top, all_students, box_points)
+
+
+def _outlier_stride(count, subjects, box_points):
+    """Keep every stride-th outlier of a subject so all subjects fit in box_points."""
+    quota = max(1, box_points // max(subjects, 1))
+    return max(1, math.ceil(count / quota))
+
+
+def _subject_box_from_frame(df, box_points):
+    """Pandas equivalent of the PostgreSQL quartile/whisker/outlier queries."""
+    import pandas as pd
+    if df.empty:
+        return pd.DataFrame(columns=SUBJECT_BOX_COLUMNS), pd.DataFrame(columns=SUBJECT_OUTLIER_COLUMNS)
+    grouped = df.groupby('subject')['total']
+    # Linear interpolation, as percentile_cont
+    stats = pd.DataFrame({
+        'count': grouped.count(),
+        'q1': grouped.quantile(0.25),
+        'median': grouped.median(),
+        'q3': grouped.quantile(0.75),
+        'mean': grouped.mean()
+    })
+    iqr = stats['q3'] - stats['q1']
+    low = df['subject'].map(stats['q1'] - 1.5 * iqr)
+    high = df['subject'].map(stats['q3'] + 1.5 * iqr)
+    inside = (df['total'] >= low) & (df['total'] <= high)
+    inliers = df.loc[inside].groupby('subject')['total']
+    stats['lowerfence'] = inliers.min()
+    stats['upperfence'] = inliers.max()
+    box = stats.reset_index()[SUBJECT_BOX_COLUMNS]
+    box[SUBJECT_BOX_COLUMNS[2:]] = box[SUBJECT_BOX_COLUMNS[2:]].astype(float)
+
+    outliers = df.loc[~inside, SUBJECT_OUTLIER_COLUMNS].sort_values(SUBJECT_OUTLIER_COLUMNS, kind='stable')
+    rank = outliers.groupby('subject').cumcount()
+    stride = outliers.groupby('subject')['total'].transform('size').map(
+        lambda count: _outlier_stride(count, len(box), box_points)
+    )
+    outliers = outliers[rank % stride == 0].reset_index(drop=True)
+    return box, outliers
+
+
+def _series_from_frame(df, top, all_students, box_points=BOX_POINTS):
+    top_ids = top['student_id'].tolist()
+
+    student_semester = df.groupby(['student_id', 'student_name', 'semester'])['total'].mean().reset_index()
+    progress = student_semester[student_semester['student_id'].isin(top_ids)].copy()
+    progress['cumulative_avg'] = cumulative_average(progress, 'student_id', 'semester')
+    if not all_students:
+        student_semester = student_semester[student_semester['student_id'].isin(top_ids)]
+
+    subject_box, subject_outliers = _subject_box_from_frame(df, box_points)
+    return {
+        'mean_total': df['total'].mean() if not df.empty else None,
+        'top_students': top[TOP_COLUMNS],
+        'student_semester': student_semester.reset_index(drop=True),
+        'progress': progress[PROGRESS_COLUMNS].reset_index(drop=True),
+        'subject_semester': df.groupby(['subject', 'semester'])['total'].mean().reset_index(),
+        'subject_box': subject_box,
+        'subject_outliers': subject_outliers,
+    }
+
+
+def _frame(stmt, columns, numeric=()):
+    import pandas as pd
+    df = pd.DataFrame.from_records(db.session.execute(stmt).all(), columns=columns)
+    # AVG and percentile_cont come back as Decimal/float; plot them as floats
+    for name in numeric:
+        df[name] = df[name].astype(float)
+    return df
+
+
+def _with_names(stmt, grouped):
+    """Join a per-student aggregate to the student's name."""
+    return (
+        stmt.join(Student, Student.id == grouped.c.student_id)
+        .join(User, Student.user_id == User.id)
+    )
+
+
+def _series_from_sql(semester, top, top_query, all_students, box_points=BOX_POINTS):
+    marks = select(
+        type_coerce(Mark.student_id, db.String).label('student_id'),
+        Mark.subject,
+        Mark.semester,
+        Mark.total
+    ).where(Mark.total.isnot(None))
+    if semester is not None:
+        marks = marks.where(Mark.semester == semester)
+    marks = marks.cte('marks')
+
+    top_ids = select(top_query.cte('top').c.student_id)
+
+    semester_means = select(
+        marks.c.student_id, marks.c.semester, func.avg(marks.c.total).label('total')
+    ).group_by(marks.c.student_id, marks.c.semester)
+    if not all_students:
+        semester_means = semester_means.where(marks.c.student_id.in_(top_ids))
+    semester_means = semester_means.cte('semester_means')
+    student_semester = _frame(
+        _with_names(select(semester_means.c.student_id, User.name, semester_means.c.semester,
+                           semester_means.c.total), semester_means)
+        .order_by(semester_means.c.student_id, semester_means.c.semester),
+        STUDENT_SEMESTER_COLUMNS, numeric=['total']
+    )
+
+    top_means = (
+        select(marks.c.student_id, marks.c.semester, func.avg(marks.c.total).label('total'))
+        .where(marks.c.student_id.in_(top_ids))
+        .group_by(marks.c.student_id, marks.c.semester)
+        .cte('top_means')
+    )
+    running = func.avg(top_means.c.total).over(
+        partition_by=top_means.c.student_id,
+        order_by=top_means.c.semester,
+        rows=(None, 0)
+    )
+    progress = _frame(
+        _with_names(select(top_means.c.student_id, User.name, top_means.c.semester, top_means.c.total,
+                           running.label('cumulative_avg')), top_means)
+        .order_by(top_means.c.student_id, top_means.c.semester),
+        PROGRESS_COLUMNS, numeric=['total', 'cumulative_avg']
+    )
+
+    subject_semester = _frame(
+        select(marks.c.subject, marks.c.semester, func.avg(marks.c.total))
+        .group_by(marks.c.subject, marks.c.semester)
+        .order_by(marks.c.subject, marks.c.semester),
+        SUBJECT_SEMESTER_COLUMNS, numeric=['total']
+    )
+
+    def quantile(fraction):
+        return func.percentile_cont(fraction).within_group(marks.c.total)
+
+    quartiles = (
+        select(marks.c.subject, func.count().label('count'), quantile(0.25).label('q1'),
+               quantile(0.5).label('median'), quantile(0.75).label('q3'), func.avg(marks.c.total).label('mean'))
+        .group_by(marks.c.subject)
+        .cte('quartiles')
+    )
+    # Marks with a flag for lying within 1.5 IQR of their subject's box
+    iqr = quartiles.c.q3 - quartiles.c.q1
+    flagged = (
+        select(marks.c.subject, marks.c.total,
+               marks.c.total.between(quartiles.c.q1 - 1.5 * iqr, quartiles.c.q3 + 1.5 * iqr).label('inside'))
+        .join(quartiles, quartiles.c.subject == marks.c.subject)
+        .cte('flagged')
+    )
+    fences = (
+        select(flagged.c.subject,
+               func.min(flagged.c.total).filter(flagged.c.inside).label('lowerfence'),
+               func.max(flagged.c.total).filter(flagged.c.inside).label('upperfence'))
+        .group_by(flagged.c.subject)
+        .cte('fences')
+    )
+    subject_box = _frame(
+        select(quartiles.c.subject, quartiles.c.count, fences.c.lowerfence, quartiles.c.q1, quartiles.c.median,
+               quartiles.c.q3, fences.c.upperfence, quartiles.c.mean)
+        .join(fences, fences.c.subject == quartiles.c.subject)
+        .order_by(quartiles.c.subject),
+        SUBJECT_BOX_COLUMNS, numeric=SUBJECT_BOX_COLUMNS[2:]
+    )
+
+    # Every stride-th outlier per subject, in order of total (as in _subject_box_from_frame)
+    outliers = (
+        select(flagged.c.subject, flagged.c.total,
+               func.row_number().over(partition_by=flagged.c.subject,
+                                      order_by=flagged.c.total).label('rank'),
+               func.count().over(partition_by=flagged.c.subject).label('n'))
+        .where(~flagged.c.inside)
+        .cte('outliers')
+    )
+    quota = literal(max(1, box_points // max(len(subject_box), 1)))
+    stride = func.greatest(1, (outliers.c.n + quota - 1) // quota)
+    subject_outliers = _frame(
+        select(outliers.c.subject, outliers.c.total)
+        .where((outliers.c.rank - 1) % stride == 0)
+        .order_by(outliers.c.subject, outliers.c.total),
+        SUBJECT_OUTLIER_COLUMNS, numeric=['total']
+    )
+
+    mean_total = db.session.scalar(select(func.avg(marks.c.total)))
+    return {
+        'mean_total': float(mean_total) if mean_total is not None else None,
+        'top_students': top[TOP_COLUMNS],
+        'student_semester': student_semester,
+        'progress': progress,
+        'subject_semester': subject_semester,
+        'subject_box': subject_box,
+        'subject_outliers': subject_outliers,
+    }
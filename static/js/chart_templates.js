@@ -0,0 +1,213 @@
+// Figure templates for the staff dashboard refresh charts.
+//
+// /api/refresh-stats with {format: 'data'} returns only the aggregated series;
+// the layouts, colours and play/pause menus live here so they are downloaded
+// once and cached by the browser instead of being resent on every refresh.
+(function (global) {
+    // Plotly Express' default qualitative palette, so colours match the
+    // server-rendered figures
+    const PALETTE = [
+        '#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A',
+        '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52'
+    ];
+
+    // The parts of plotly.py's plotly_white template these charts use.
+    // plotly.js has no named templates (a template: 'plotly_white' string is
+    // ignored), so it is shipped as an object
+    const PLOTLY_WHITE = {
+        layout: {
+            autotypenumbers: 'strict',
+            colorway: PALETTE,
+            font: { color: '#2a3f5f' },
+            hovermode: 'closest',
+            hoverlabel: { align: 'left' },
+            paper_bgcolor: 'white',
+            plot_bgcolor: 'white',
+            title: { x: 0.05 },
+            xaxis: {
+                gridcolor: '#EBF0F8', linecolor: '#EBF0F8', zerolinecolor: '#EBF0F8',
+                ticks: '', title: { standoff: 15 }, automargin: true, zerolinewidth: 2
+            },
+            yaxis: {
+                gridcolor: '#EBF0F8', linecolor: '#EBF0F8', zerolinecolor: '#EBF0F8',
+                ticks: '', title: { standoff: 15 }, automargin: true, zerolinewidth: 2
+            }
+        },
+        data: {
+            bar: [{
+                error_x: { color: '#2a3f5f' },
+                error_y: { color: '#2a3f5f' },
+                marker: { line: { color: 'white', width: 0.5 } }
+            }]
+        }
+    };
+
+    // Play/pause buttons shared by all animated charts
+    const ANIMATION_MENU = [{
+        type: 'buttons',
+        buttons: [
+            {
+                label: 'Play',
+                method: 'animate',
+                args: [null, {
+                    frame: { duration: 1000, redraw: true },
+                    mode: 'immediate',
+                    fromcurrent: true
+                }]
+            },
+            {
+                label: 'Pause',
+                method: 'animate',
+                args: [[null], {
+                    frame: { duration: 0, redraw: false },
+                    mode: 'immediate',
+                    fromcurrent: true
+                }]
+            }
+        ],
+        direction: 'left',
+        pad: { r: 10, t: 87 },
+        showactive: true,
+        x: 0.1,
+        xanchor: 'right',
+        y: 0,
+        yanchor: 'top'
+    }];
+
+    function baseLayout(title, xTitle, yTitle) {
+        return {
+            title: { text: title },
+            xaxis: { title: { text: xTitle } },
+            yaxis: { title: { text: yTitle } },
+            template: PLOTLY_WHITE
+        };
+    }
+
+    // Split parallel column arrays into {key: {column: [...]}} by a key column
+    function groupBy(columns, key) {
+        const groups = new Map();
+        columns[key].forEach((value, i) => {
+            if (!groups.has(value)) {
+                groups.set(value, {});
+            }
+            const group = groups.get(value);
+            Object.keys(columns).forEach(name => {
+                (group[name] = group[name] || []).push(columns[name][i]);
+            });
+        });
+        return groups;
+    }
+
+    // Animated chart with one frame per semester and one trace per series
+    function animatedFigure(columns, seriesKey, makeTrace, layout) {
+        const series = Array.from(new Set(columns[seriesKey]));
+        const frames = [];
+        groupBy(columns, 'semester').forEach((rows, semester) => {
+            const bySeries = groupBy(rows, seriesKey);
+            frames.push({
+                name: String(semester),
+                data: series.map((name, i) => makeTrace(name, bySeries.get(name) || { semester: [], total: [] }, i))
+            });
+        });
+        frames.sort((a, b) => Number(a.name) - Number(b.name));
+
+        layout.updatemenus = ANIMATION_MENU;
+        layout.sliders = [{
+            active: 0,
+            currentvalue: { prefix: 'semester=' },
+            len: 0.9,
+            x: 0.1,
+            y: 0,
+            pad: { b: 10, t: 60 },
+            steps: frames.map(frame => ({
+                label: frame.name,
+                method: 'animate',
+                args: [[frame.name], { frame: { duration: 0, redraw: true }, mode: 'immediate' }]
+            }))
+        }];
+        return { data: frames.length ? frames[0].data : [], layout: layout, frames: frames };
+    }
+
+    function subjectChart(series, label) {
+        // Quartiles and whiskers computed on the server, plus sampled outliers
+        const box = series.subject.box;
+        const outliers = series.subject.outliers;
+        const data = box.subject.length ? [{
+            type: 'box',
+            x: box.subject,
+            q1: box.q1,
+            median: box.median,
+            q3: box.q3,
+            lowerfence: box.lowerfence,
+            upperfence: box.upperfence,
+            mean: box.mean,
+            name: 'Marks Distribution',
+            marker: { color: '#3498db' }
+        }, {
+            type: 'scatter',
+            mode: 'markers',
+            x: outliers.subject,
+            y: outliers.total,
+            name: 'Outliers',
+            marker: { color: '#3498db' },
+            showlegend: false
+        }] : [];
+        return { data: data, layout: baseLayout(`${label} - Subject Performance Distribution`, 'Subject', 'Marks') };
+    }
+
+    function topChart(series, label) {
+        const top = series.top;
+        const data = top.total.length ? [{
+            type: 'bar',
+            x: top.total,
+            y: top.student_name,
+            orientation: 'h',
+            marker: { color: '#2ecc71' },
+            text: top.total,
+            textposition: 'auto'
+        }] : [];
+        return { data: data, layout: baseLayout(`${label} - Top 10 Performers`, 'Average Marks', 'Student') };
+    }
+
+    function scatterChart(series, label) {
+        const maxTotal = Math.max(1, ...series.scatter.total);
+        return animatedFigure(series.scatter, 'student_name', (name, rows, i) => ({
+            type: 'scatter',
+            mode: 'markers',
+            name: name,
+            legendgroup: name,
+            x: rows.semester,
+            y: rows.total,
+            marker: {
+                color: PALETTE[i % PALETTE.length],
+                size: rows.total,
+                sizemode: 'area',
+                sizeref: 2 * maxTotal / (20 * 20)
+            }
+        }), baseLayout(`${label} - Student Performance Animation`, 'Semester', 'Average Marks'));
+    }
+
+    function barChart(series, label) {
+        return animatedFigure(series.bar, 'subject', (name, rows, i) => ({
+            type: 'bar',
+            name: name,
+            legendgroup: name,
+            x: rows.subject || [],
+            y: rows.total,
+            marker: { color: PALETTE[i % PALETTE.length] }
+        }), baseLayout(`${label} - Subject Performance Animation`, 'Subject', 'Average Marks'));
+    }
+
+    global.StaffChartTemplates = {
+        // Chart element id -> figure built from a data-mode refresh payload
+        build: function (series) {
+            const label = series.semester_label;
+            return {
+                'subject-chart': subjectChart(series, label),
+                'top-chart': topChart(series, label),
+                'scatter-chart': scatterChart(series, label),
+                'bar-chart': barChart(series, label)
+            };
+        }
+    };
+})(window);
@@ -0,0 +1,34 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, User, Student
+
+
+@pytest.fixture
+def app():
+    app = create_app({'TESTING': True, 'SECRET_KEY': 'test', 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_student(name='Example Student', department='Civil', reg_no='20240001'):
+    """Commit a student user and return the Student."""
+    user = User(id=uuid.uuid4(), name=name, role='student')
+    student = Student(id=uuid.uuid4(), user_id=user.id, reg_no=reg_no, department=department, semester=1)
+    db.session.add_all([user, student])
+    db.session.commit()
+    return student
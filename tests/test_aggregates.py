@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+from models import db, Mark, MarkAggregate, StudentTotal
+from aggregates import audit_aggregates, rebuild_aggregates
+from conftest import add_student
+
+
+def add_mark(student, subject='Physics', semester=1, internal=45, external=45, total=90):
+    mark = Mark(id=uuid.uuid4(), student_id=student.id, semester=semester, subject=subject,
+                internal=internal, external=external, total=total)
+    db.session.add(mark)
+    db.session.commit()
+    return mark
+
+
+def test_mark_of_student_without_department(app):
+    student = add_student(department=None)
+
+    add_mark(student)
+
+    row = MarkAggregate.query.filter_by(grain='department').one()
+    assert (row.department, row.count, row.sum_total) == ('', 1, 90)
+    assert audit_aggregates(db.session.connection()) == []
+    rebuild_aggregates(db.session.connection())
+    assert audit_aggregates(db.session.connection()) == []
+
+
+def test_student_leaving_department_moves_marks(app):
+    student = add_student()
+    add_mark(student)
+
+    student.department = None
+    db.session.commit()
+
+    assert MarkAggregate.query.filter_by(grain='department').one().department == ''
+    assert audit_aggregates(db.session.connection()) == []
+
+
+def test_audit_counts_missing_internal_and_external_as_zero(app):
+    student = add_student()
+    add_mark(student, internal=None, external=None, total=80)
+
+    assert audit_aggregates(db.session.connection()) == []
+    rebuild_aggregates(db.session.connection())
+    row = MarkAggregate.query.filter_by(grain='cohort').one()
+    assert (row.sum_total, row.sum_internal, row.sum_external) == (80, 0, 0)
+
+
+def test_delete_student_with_marks(app):
+    student = add_student()
+    other = add_student(name='Other Student', reg_no='20240002')
+    add_mark(student)
+    add_mark(other, total=70, internal=35, external=35)
+
+    for mark in Mark.query.filter_by(student_id=student.id):
+        db.session.delete(mark)
+    db.session.delete(student)
+    db.session.commit()
+
+    row = MarkAggregate.query.filter_by(grain='department').one()
+    assert (row.department, row.count, row.sum_total) == ('Civil', 1, 70)
+    assert audit_aggregates(db.session.connection()) == []
+
+
+@pytest.mark.parametrize('missing', ['semester', 'subject'])
+def test_marks_without_semester_or_subject_are_not_counted(app, missing):
+    student = add_student()
+    add_mark(student, total=60, internal=30, external=30)
+    mark = add_mark(student, **{'subject': 'Chemistry', 'semester': 2, missing: None})
+
+    totals = {row.semester: row.count for row in StudentTotal.query}
+    assert totals == {0: 1, 1: 1}
+    assert MarkAggregate.query.filter_by(grain='cohort').one().count == 1
+    assert audit_aggregates(db.session.connection()) == []
+
+    setattr(mark, missing, 'Chemistry' if missing == 'subject' else 2)
+    db.session.commit()
+    assert MarkAggregate.query.filter_by(grain='cohort').one().count == 2
+    rebuild_aggregates(db.session.connection())
+    assert audit_aggregates(db.session.connection()) == []
@@ -0,0 +1,27 @@
+import gzip
+
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/static/js/chart_templates.js', '/static/css/custom.css'])
+def test_static_files_are_compressed(client, path):
+    plain = client.get(path)
+    body = plain.get_data()
+    plain.close()
+
+    response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == body
+    assert 'Accept-Encoding' in response.vary
+    response.close()
+
+
+def test_static_file_revalidates_when_compressed(client):
+    first = client.get('/static/js/chart_templates.js', headers={'Accept-Encoding': 'gzip'})
+    first.close()
+
+    again = client.get('/static/js/chart_templates.js',
+                       headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+
+    assert again.status_code == 304
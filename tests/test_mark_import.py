@@ -0,0 +1,127 @@
+import io
+import uuid
+
+import pytest
+from sqlalchemy import MetaData, UniqueConstraint, create_engine, insert, inspect, select, func
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Student, Mark, Mentorship
+from cache import data_version
+from aggregates import audit_aggregates
+from mark_import import import_marks
+from migrate_db import migrate
+from app import create_app, init_db
+from conftest import add_student
+
+
+def sheet(*rows):
+    lines = ['reg_no,semester,subject,internal,external'] + [','.join(map(str, row)) for row in rows]
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+def test_reimport_updates_instead_of_duplicating(app):
+    add_student(reg_no='20240001')
+
+    first = import_marks(sheet(('20240001', 1, 'Physics', 40, 40)), 'csv')
+    second = import_marks(sheet(('20240001', 1, 'Physics', 45, 45), ('20240001', 1, 'Chemistry', 30, 30)), 'csv')
+
+    assert (first['inserted'], first['updated']) == (1, 0)
+    assert (second['inserted'], second['updated']) == (1, 1)
+    assert Mark.query.filter_by(subject='Physics').one().total == 90
+    assert audit_aggregates(db.session.connection()) == []
+
+
+def test_import_updates_mark_stored_after_lookup(app, monkeypatch):
+    student = add_student(reg_no='20240001')
+    import mark_import
+    lookup = mark_import._stored_marks
+
+    # Another writer stores the mark between the lookup and the insert
+    def racing_lookup(connection, student_ids):
+        found = lookup(connection, student_ids)
+        if not found:
+            connection.execute(insert(Mark.__table__), {
+                'id': uuid.uuid4(), 'student_id': student.id, 'semester': 1, 'subject': 'Physics',
+                'internal': 40, 'external': 40, 'total': 80
+            })
+        return found
+
+    monkeypatch.setattr(mark_import, '_stored_marks', racing_lookup)
+
+    report = import_marks(sheet(('20240001', 1, 'Physics', 45, 45)), 'csv')
+
+    assert (report['inserted'], report['updated']) == (0, 1)
+    assert [mark.total for mark in Mark.query.all()] == [90]
+
+
+def test_orm_duplicate_mark_is_rejected(app):
+    student = add_student()
+    for _ in range(2):
+        db.session.add(Mark(id=uuid.uuid4(), student_id=student.id, semester=1, subject='Physics',
+                            internal=45, external=45, total=90))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def legacy_database(path):
+    """SQLite database at path whose mark table lacks the unique key, holding one mark twice."""
+    legacy = MetaData()
+    for table in db.metadata.sorted_tables:
+        table.to_metadata(legacy)
+    mark = legacy.tables['mark']
+    mark.constraints -= {constraint for constraint in mark.constraints if isinstance(constraint, UniqueConstraint)}
+    engine = create_engine(f'sqlite:///{path}')
+    student_id = uuid.uuid4()
+    with engine.begin() as connection:
+        legacy.create_all(connection)
+        connection.execute(insert(legacy.tables['user']), {'id': student_id, 'name': 'Example', 'role': 'student'})
+        connection.execute(insert(legacy.tables['student']),
+                           {'id': student_id, 'user_id': student_id, 'reg_no': '20240001', 'department': 'Civil'})
+        connection.execute(insert(mark), [
+            {'id': uuid.uuid4(), 'student_id': student_id, 'semester': 1, 'subject': 'Physics',
+             'internal': total // 2, 'external': total // 2, 'total': total}
+            for total in (80, 90)
+        ])
+    return engine
+
+
+def has_mark_key(engine):
+    with engine.connect() as connection:
+        indexes = inspect(connection).get_indexes('mark')
+    return any(index['unique'] and index['column_names'] == ['student_id', 'semester', 'subject'] for index in indexes)
+
+
+def test_migrate_adds_mark_key_and_drops_duplicates(tmp_path):
+    engine = legacy_database(tmp_path / 'academic.db')
+
+    migrate(str(tmp_path / 'academic.db'))
+
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(Mark.__table__)) == 1
+    assert has_mark_key(engine)
+
+
+def test_init_db_adds_mark_key_before_imports(tmp_path):
+    engine = legacy_database(tmp_path / 'academic.db')
+    app = create_app({'SECRET_KEY': 'test', 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "academic.db"}'})
+    with app.app_context():
+        init_db()
+
+        report = import_marks(sheet(('20240001', 1, 'Chemistry', 40, 40)), 'csv')
+
+        assert report['inserted'] == 1
+        assert Mark.query.count() == 2
+        assert audit_aggregates(db.session.connection()) == []
+        db.session.remove()
+        db.engine.dispose()
+    assert has_mark_key(engine)
+
+
+def test_import_leaves_network_version_alone(app):
+    add_student(reg_no='20240001')
+    network, marks = data_version(User, Student, Mentorship), data_version(Mark)
+
+    import_marks(sheet(('20240001', 1, 'Physics', 40, 40), ('20240001', 2, 'Physics', 45, 45)), 'csv', chunk_size=1)
+
+    assert data_version(User, Student, Mentorship) == network
+    assert data_version(Mark) == marks + 2
@@ -0,0 +1,12 @@
+import os
+import stat
+
+import network_graph
+
+
+def test_artifact_is_world_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(network_graph, 'STATIC_DIR', str(tmp_path))
+
+    filename = network_graph.write_artifact('<html></html>')
+
+    assert stat.S_IMODE(os.stat(tmp_path / filename).st_mode) == 0o644
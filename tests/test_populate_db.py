@@ -0,0 +1,14 @@
+import argparse
+
+import pytest
+from populate_db import positive_int
+
+
+@pytest.mark.parametrize('value', ['0', '-5'])
+def test_chunk_size_must_be_positive(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int(value)
+
+
+def test_chunk_size_accepts_positive():
+    assert positive_int('20000') == 20000
@@ -0,0 +1,37 @@
+import uuid
+
+from models import db, User, Mark
+from conftest import add_student
+
+
+def test_data_refresh_for_semester_without_marks(client):
+    student = add_student()
+    db.session.add(Mark(id=uuid.uuid4(), student_id=student.id, semester=1, subject='Physics',
+                        internal=45, external=45, total=90))
+    db.session.commit()
+
+    response = client.get('/api/refresh-stats?semester=2&format=data')
+
+    assert response.status_code == 200
+    assert response.get_json()['top'] == {'student_name': [], 'total': []}
+
+
+def test_top_students_keep_numeric_columns_when_empty(app):
+    from aggregates import top_students
+
+    top = top_students(10, semester=3)
+
+    assert top.empty
+    assert top['total'].dtype == float
+    assert top['semesters'].dtype == int
+
+
+def test_staff_dashboard_renders_without_marks(client):
+    staff = User(id=uuid.uuid4(), name='Prof. Example', role='staff')
+    db.session.add(staff)
+    db.session.commit()
+
+    response = client.get(f'/dashboard/staff/{staff.id}')
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).rstrip().endswith('</html>')
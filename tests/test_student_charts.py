@@ -0,0 +1,33 @@
+import uuid
+
+import pytest
+from models import db, Mark
+from charts import FIGURES
+from conftest import add_student
+
+
+@pytest.fixture
+def student(app):
+    student = add_student()
+    db.session.add(Mark(id=uuid.uuid4(), student_id=student.id, semester=1, subject='Physics',
+                        internal=45, external=45, total=90))
+    db.session.commit()
+    return student
+
+
+@pytest.mark.parametrize('name', FIGURES)
+def test_chart_for_semester_without_marks(client, student, name):
+    response = client.get(f'/api/student/{student.id}/chart/{name}?semester=2')
+
+    assert response.status_code == 200
+    assert 'data' in response.get_json()
+
+
+def test_chart_revalidates_on_etag_only(client, student):
+    first = client.get(f'/api/student/{student.id}/chart/bar')
+
+    assert first.status_code == 200
+    assert first.headers.get('ETag')
+    assert 'Last-Modified' not in first.headers
+    cached = client.get(f'/api/student/{student.id}/chart/bar', headers={'If-None-Match': first.headers['ETag']})
+    assert cached.status_code == 304
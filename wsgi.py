@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers, e.g.
+
+    flask --app wsgi init-db
+    gunicorn -w 4 wsgi:app
+"""
+from app import create_app
+
+app = create_app()